@@ -0,0 +1,222 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DIR = os.path.join(PROJECT_ROOT, "data/answer_cache")
+
+# Answer cache
+# generate_answer is a pure function of (question, retrieved rows, logic,
+# history) for a fixed model and prompt, and different SPARQL for the same
+# question often retrieves the same rows. Answers are cached under a hash of:
+#   - the normalized question (NFC, lower-case, whitespace collapsed,
+#     trailing punctuation dropped)
+#   - the canonical row set (each row with sorted keys, rows sorted), so
+#     row order and variable order do not matter
+#   - the flags the answer prompt branches on (OUT_OF_CURRICULUM)
+#   - the conversation history ("" for single-turn questions)
+#   - a version string (answer models + prompt text): editing the prompt
+#     or switching models invalidates every entry
+# Two tiers: an in-process LRU (byte budget) in front of a directory of JSON
+# files (byte budget, mtime as LRU clock) that survives restarts and can be
+# shared by workers.
+OUT_OF_CURRICULUM = "OUT_OF_CURRICULUM"
+
+_TRAILING_PUNCT = re.compile(r"[\s?!.~…]+$")
+
+def normalize_question(text):
+    text = " ".join(unicodedata.normalize("NFC", text).lower().split())
+    return _TRAILING_PUNCT.sub("", text)
+
+def canonical_rows(rows):
+    return sorted(json.dumps(row, ensure_ascii=False, sort_keys=True) for row in rows or [])
+
+def answer_key(question, rows, explanation, history="", version=""):
+    payload = {
+        "question": normalize_question(question),
+        "rows": canonical_rows(rows),
+        "flags": {"out_of_curriculum": OUT_OF_CURRICULUM in (explanation or "")},
+        "history": history or "",
+        "version": version,
+    }
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+def prompt_version(*parts):
+    """Short digest of the prompt/model strings an answer depends on."""
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class AnswerCache:
+    """
+    Two-tier (memory + disk) cache of generated answers.
+
+    Usage:
+        key = answer_key(question, rows, explanation, history, version)
+        answer = cache.get(key)
+        if answer is None:
+            answer = generate(...)
+            cache.put(key, answer)
+
+    Args:
+        max_bytes (int): memory tier budget (encoded JSON size).
+        directory (str): disk tier location, None to disable it. Created on
+            the first write.
+        max_disk_bytes (int): disk tier budget.
+        evict_interval (float): minimum seconds between disk eviction scans.
+    """
+
+    def __init__(self, max_bytes=16 << 20, directory=None, max_disk_bytes=256 << 20, evict_interval=60):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.evict_interval = evict_interval
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._last_evict = 0.0
+        self._entries = OrderedDict()  # key -> (encoded JSON, size)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """A fresh copy of the cached answer dict, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(entry[0])
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, data)
+        return json.loads(data)
+
+    def put(self, key, answer):
+        data = json.dumps(answer, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, data)
+        self._write_disk(key, data)
+
+    def _remember(self, key, data):
+        # Caller holds the lock
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._entries[key] = (data, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = f.read()
+            json.loads(data)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return data
+
+    def _write_disk(self, key, data):
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[WARN] Answer cache write failed: {e}")
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        # Directory scans are O(entries); run them at most every evict_interval.
+        now = time.time()
+        if now - self._last_evict < self.evict_interval:
+            return
+        self._last_evict = now
+
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+        if self.directory and os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json"):
+                    os.remove(entry.path)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "disk": self.directory,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+def create_answer_cache(**kwargs):
+    """
+    Builds the cache from $ANSWER_CACHE_MB (memory), $ANSWER_CACHE_DISK_MB
+    and $ANSWER_CACHE_DIR ("" disables the disk tier).
+    """
+    directory = os.getenv("ANSWER_CACHE_DIR", DEFAULT_DIR)
+    return AnswerCache(
+        max_bytes=int(os.getenv("ANSWER_CACHE_MB", "16")) << 20,
+        directory=directory or None,
+        max_disk_bytes=int(os.getenv("ANSWER_CACHE_DISK_MB", "256")) << 20,
+        **kwargs,
+    )
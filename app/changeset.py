@@ -0,0 +1,194 @@
+import os
+import sys
+import time
+import fcntl
+import rdflib
+from contextlib import contextmanager
+
+# Append-only changeset log next to a Turtle base snapshot:
+#   data/knowledge_graph/math_abox.ttl          <- base snapshot
+#   data/knowledge_graph/math_abox.changes.nt   <- ordered changesets
+#
+# Log format (N-Triples with a one-character op prefix):
+#   # changeset 1697712345.123 connect_prerequisites
+#   + <http://math.bot/ontology/Sec_3f1c0a9e52> <http://math.bot/ontology/prerequisiteOf> <...> .
+#   - <...> <...> "old value" .
+#
+# Records are applied strictly in file order. Writers append under an
+# exclusive flock, so concurrent ETL runs cannot lose each other's edits.
+
+def changes_path(base_path):
+    root, _ = os.path.splitext(base_path)
+    return root + ".changes.nt"
+
+@contextmanager
+def _locked(base_path):
+    """Exclusive advisory lock shared by appenders and compaction."""
+    lock_path = changes_path(base_path) + ".lock"
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def nt_lines(triples):
+    """
+    N-Triples lines for `triples`, in sorted order. Uses rdflib's N-Triples
+    serializer: Term.n3() writes multi-line literals in the Turtle long form
+    (triple-quoted), which N-Triples parsers reject.
+    """
+    g = rdflib.Graph()
+    for triple in triples:
+        g.add(triple)
+    return sorted(line for line in g.serialize(format="nt").splitlines() if line)
+
+def format_changeset(added=(), removed=(), source=""):
+    """One changeset block (removals first, then additions), or "" if empty."""
+    lines = [f"- {line}" for line in nt_lines(removed)] + [f"+ {line}" for line in nt_lines(added)]
+    if not lines:
+        return ""
+    return f"# changeset {time.time():.3f} {source}\n" + "\n".join(lines) + "\n"
+
+def append_changeset(base_path, added=(), removed=(), source=""):
+    """
+    Appends one changeset (removals first, then additions) to the log.
+    Cost is proportional to the size of the change, not of the graph.
+    Returns the number of records written.
+    """
+    block = format_changeset(added, removed, source)
+    if not block:
+        return 0
+
+    with _locked(base_path):
+        with open(changes_path(base_path), "a", encoding="utf-8") as f:
+            f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+    return block.count("\n") - 1
+
+def replay(graph, base_path):
+    """
+    Applies the changeset log (if any) to `graph` in order.
+    Returns the number of records applied.
+    """
+    return apply_changes(graph, changes_path(base_path))
+
+def apply_changes(graph, path):
+    """
+    Applies a changeset file to `graph` in order.
+    Consecutive records with the same op are parsed as one N-Triples chunk.
+    Returns the number of records applied.
+    """
+    if not os.path.exists(path):
+        return 0
+
+    applied = 0
+    chunk, chunk_op = [], None
+
+    def flush():
+        nonlocal applied
+        if not chunk:
+            return
+        parsed = rdflib.Graph()
+        parsed.parse(data="\n".join(chunk), format="nt")
+        for triple in parsed:
+            if chunk_op == "+":
+                graph.add(triple)
+            else:
+                graph.remove(triple)
+        applied += len(chunk)
+        chunk.clear()
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            op, record = line[0], line[2:]
+            if op not in "+-":
+                print(f"[WARN] Skipping malformed changeset record: {line[:80]}")
+                continue
+            if op != chunk_op:
+                flush()
+                chunk_op = op
+            chunk.append(record)
+    flush()
+    return applied
+
+def load_with_changes(base_path, fmt="turtle"):
+    """Base snapshot + replayed changeset log."""
+    g = rdflib.Graph()
+    g.parse(base_path, format=fmt)
+    applied = replay(g, base_path)
+    if applied:
+        print(f"[INFO] Replayed {applied} changeset record(s) onto {base_path}")
+    return g
+
+def write_snapshot(graph, base_path, fmt="turtle"):
+    """
+    Writes `graph` as the new base snapshot and clears the log, atomically
+    with respect to appenders. Used by compaction and full regenerations.
+    """
+    with _locked(base_path):
+        tmp_path = base_path + ".tmp"
+        graph.serialize(destination=tmp_path, format=fmt)
+        os.replace(tmp_path, base_path)
+        log_path = changes_path(base_path)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+
+def fold_into_snapshot(graph, base_path, fmt="turtle", archive=None):
+    """
+    Like write_snapshot for a regenerated `graph`, but first applies the
+    pending log to it, under the same lock, so no appended changeset is
+    dropped. With `archive`, the folded records are also appended there
+    (e.g. so a build can replay them on later rebuilds).
+    Returns the number of records folded.
+    """
+    with _locked(base_path):
+        log_path = changes_path(base_path)
+        applied = apply_changes(graph, log_path)
+        if applied and archive:
+            with open(log_path, "r", encoding="utf-8") as src, open(archive, "a", encoding="utf-8") as dest:
+                dest.write(src.read())
+                dest.flush()
+                os.fsync(dest.fileno())
+        tmp_path = base_path + ".tmp"
+        graph.serialize(destination=tmp_path, format=fmt)
+        os.replace(tmp_path, base_path)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+    return applied
+
+def compact(base_path, fmt="turtle"):
+    """Folds the changeset log back into the Turtle base snapshot."""
+    with _locked(base_path):
+        g = rdflib.Graph()
+        g.parse(base_path, format=fmt)
+        applied = replay(g, base_path)
+        if not applied:
+            print(f"[INFO] Nothing to compact for {base_path}")
+            return 0
+        tmp_path = base_path + ".tmp"
+        g.serialize(destination=tmp_path, format=fmt)
+        os.replace(tmp_path, base_path)
+        os.remove(changes_path(base_path))
+    print(f"[SUCCESS] Compacted {applied} record(s) into {base_path}")
+    return applied
+
+if __name__ == "__main__":
+    # Usage: python app/changeset.py [compact|status] [base.ttl]
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    base = sys.argv[2] if len(sys.argv) > 2 else "data/knowledge_graph/math_abox.ttl"
+
+    if command == "compact":
+        compact(base)
+    else:
+        path = changes_path(base)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                records = sum(1 for line in f if line[:1] in "+-" and line.strip())
+            print(f"{path}: {records} pending record(s)")
+        else:
+            print(f"{path}: no pending changes")
@@ -0,0 +1,126 @@
+import re
+import unicodedata
+import numpy as np
+from rdflib import Namespace, RDF, RDFS
+
+# Namespaces
+NS = Namespace("http://math.bot/ontology/")
+
+# Local fuzzy retrieval over Concept/Section labels (+ comments)
+# Every node becomes a TF-IDF vector of character n-grams:
+#   - syllable 1-3 grams of the text with whitespace removed
+#     ("평균값 정리" == "평균값정리", so spacing variants match)
+#   - jamo 3-grams of the NFD-decomposed text (weighted by JAMO_WEIGHT), so a
+#     single wrong consonant/vowel ("밉분" for "미분") still shares most grams
+# Rows are L2-normalized; a query is one sparse mat-vec plus a top-k partition.
+INDEXED_CLASSES = [NS.Concept, NS.Section]
+SYLLABLE_NGRAMS = (1, 2, 3)
+JAMO_NGRAM = 3
+JAMO_WEIGHT = 0.5
+
+_SPACES = re.compile(r"\s+")
+
+def _normalize(text):
+    return _SPACES.sub("", unicodedata.normalize("NFC", str(text)).lower())
+
+def char_ngrams(text):
+    """Weighted n-gram features of `text`: {feature: weight}."""
+    text = _normalize(text)
+    features = {}
+    for n in SYLLABLE_NGRAMS:
+        for i in range(len(text) - n + 1):
+            gram = "s" + text[i:i + n]
+            features[gram] = features.get(gram, 0.0) + 1.0
+    jamo = unicodedata.normalize("NFD", text)
+    for i in range(len(jamo) - JAMO_NGRAM + 1):
+        gram = "j" + jamo[i:i + JAMO_NGRAM]
+        features[gram] = features.get(gram, 0.0) + JAMO_WEIGHT
+    return features
+
+
+class ConceptIndex:
+    """
+    Sparse TF-IDF index over the labels of Concept/Section nodes.
+
+    Usage:
+        index = ConceptIndex(graph)
+        index.search("평균값 증리", k=3)  # -> [(uri, label, score), ...]
+    """
+
+    def __init__(self, graph, classes=INDEXED_CLASSES):
+        self.uris = []
+        self.labels = []
+        docs = []
+        for cls in classes:
+            for uri in sorted(set(graph.subjects(RDF.type, cls))):
+                label = graph.value(uri, RDFS.label)
+                if label is None:
+                    continue
+                comment = graph.value(uri, RDFS.comment)
+                self.uris.append(uri)
+                self.labels.append(str(label))
+                docs.append(str(label) + (" " + str(comment) if comment else ""))
+
+        self.vocab = {}
+        rows, cols, vals = [], [], []
+        for row, doc in enumerate(docs):
+            for gram, count in char_ngrams(doc).items():
+                col = self.vocab.setdefault(gram, len(self.vocab))
+                rows.append(row)
+                cols.append(col)
+                vals.append(1.0 + np.log(count) if count >= 1 else count)  # sublinear tf
+
+        from scipy import sparse  # ~300 ms to import; only needed once an index is built
+        shape = (len(docs), max(len(self.vocab), 1))
+        tf = sparse.csr_matrix((vals, (rows, cols)), shape=shape, dtype=np.float32)
+        df = np.bincount(cols, minlength=shape[1]) if cols else np.zeros(shape[1])
+        self.idf = (np.log((1 + shape[0]) / (1 + df)) + 1.0).astype(np.float32)
+        matrix = tf.multiply(self.idf).tocsr()
+        norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A1
+        norms[norms == 0] = 1.0
+        self.matrix = sparse.diags(1.0 / norms).dot(matrix).tocsr().astype(np.float32)
+
+    def __len__(self):
+        return len(self.uris)
+
+    def _vectorize(self, text):
+        cols, vals = [], []
+        for gram, count in char_ngrams(text).items():
+            col = self.vocab.get(gram)
+            if col is not None:
+                cols.append(col)
+                vals.append((1.0 + np.log(count) if count >= 1 else count) * self.idf[col])
+        vec = np.zeros(self.matrix.shape[1], dtype=np.float32)
+        if cols:
+            vec[cols] = vals
+            vec /= np.linalg.norm(vec)
+        return vec
+
+    def search(self, text, k=5, min_score=0.1):
+        """Top-k (uri, label, cosine score) for `text`, best first."""
+        if not self.uris:
+            return []
+        scores = self.matrix.dot(self._vectorize(text))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.uris[i], self.labels[i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from graph_loader import load_graph
+
+    g = load_graph("data/knowledge_graph/math_abox.ttl")
+    start = time.perf_counter()
+    index = ConceptIndex(g)
+    print(f"[INFO] Indexed {len(index)} labels, {len(index.vocab)} n-grams "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    queries = sys.argv[1:] or ["평균값 증리", "미분 계수가 뭐야?", "합성 함수의미분", "삼각함수그래프"]
+    for q in queries:
+        start = time.perf_counter()
+        hits = index.search(q, k=3)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{q!r} ({elapsed:.2f} ms): " + ", ".join(f"{label} {score:.2f}" for _, label, score in hits))
@@ -0,0 +1,64 @@
+import os
+import time
+
+# Per-request time budget
+# /chat gets CHAT_DEADLINE seconds end to end. Each stage is given a share of
+# what is left when it starts (so a fast SPARQL stage leaves more time for
+# the answer), and RESERVE seconds are always kept back for the templated
+# fallback answer. A stage that runs out of time raises DeadlineExceeded and
+# the pipeline degrades instead of waiting.
+CHAT_DEADLINE = float(os.getenv("CHAT_DEADLINE", "20"))
+RESERVE = 0.05
+
+# Fraction of the remaining budget per stage
+STAGE_SHARES = {
+    "sparql": 0.4,
+    "execute": 0.25,
+    "answer": 1.0,
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    """
+    Absolute deadline for one request.
+
+    Usage:
+        deadline = Deadline(CHAT_DEADLINE)
+        timeout = deadline.budget("sparql")  # seconds for this stage
+        if deadline.expired(): ...
+    """
+
+    def __init__(self, seconds=CHAT_DEADLINE, reserve=RESERVE):
+        self.start = time.monotonic()
+        self.expires_at = self.start + seconds
+        self.reserve = reserve
+
+    def remaining(self):
+        return max(0.0, self.expires_at - self.reserve - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0.0
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def budget(self, stage):
+        """Seconds `stage` may take: its share of what is left right now."""
+        return self.remaining() * STAGE_SHARES.get(stage, 1.0)
+
+
+def stage_timeout(deadline, stage):
+    """
+    Timeout for `stage` under `deadline` (None = no deadline).
+    Raises DeadlineExceeded if nothing is left.
+    """
+    if deadline is None:
+        return None
+    timeout = deadline.budget(stage)
+    if timeout <= 0.0:
+        raise DeadlineExceeded(f"no time left for {stage}")
+    return timeout
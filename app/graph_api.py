@@ -0,0 +1,142 @@
+import gzip
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+from visualize_graph import get_node_table, expand_highlight_labels, focus_node_ids
+from graph_layout import load_or_compute_layout
+
+# Compact graph format for client-side rendering
+# - nodes: [id, key, label, group_code, x, y]  (id = integer index, stable per version)
+# - edges: [source_id, prop_code, target_id]
+GROUPS = ["Subject", "Chapter", "Section", "Concept", "Other"]
+GROUP_CODES = {name: i for i, name in enumerate(GROUPS)}
+NODE_FIELDS = ["id", "key", "label", "group", "x", "y"]
+
+
+class EncodedPayload:
+    """JSON body with its gzip form and content-hash ETag, encoded once."""
+
+    def __init__(self, obj):
+        self.body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.gzipped = gzip.compress(self.body, compresslevel=6)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+
+
+def build_graph_payload(g, node_ids=None):
+    """
+    Serializes the graph (or the `node_ids` subgraph) in the compact format.
+    Integer IDs always index the full graph, so subgraphs and highlight
+    deltas can be merged into a cached full graph on the client.
+    """
+    table = get_node_table(g)
+    index = {uri: i for i, uri in enumerate(table.nodes)}
+    props = sorted({p for _, p, _ in table.edges})
+    prop_codes = {p: i for i, p in enumerate(props)}
+    positions = load_or_compute_layout(table.version,
+                                       [str(n) for n in table.nodes],
+                                       [(str(s), str(o)) for s, _, o in table.edges])
+
+    nodes = []
+    for uri in table.nodes:
+        if node_ids is not None and uri not in node_ids: continue
+        x, y = positions.get(str(uri), (None, None))
+        nodes.append([index[uri], str(uri).split("/")[-1], table.get_label(uri),
+                      GROUP_CODES[table.group[uri]], x, y])
+
+    edges = []
+    for s, p, o in table.edges:
+        if node_ids is not None and (s not in node_ids or o not in node_ids): continue
+        edges.append([index[s], prop_codes[p], index[o]])
+
+    return {
+        "version": table.version,
+        "groups": GROUPS,
+        "props": props,
+        "fields": NODE_FIELDS,
+        "nodes": nodes,
+        "edges": edges,
+    }
+
+
+def build_highlight_payload(g, labels, hops=1):
+    """
+    Per-answer delta: integer IDs to highlight and the focused subgraph.
+    """
+    table = get_node_table(g)
+    index = {uri: i for i, uri in enumerate(table.nodes)}
+    highlight = table.ids_for_labels(expand_highlight_labels(g, labels))
+    focus = focus_node_ids(g, labels, hops)
+    return {
+        "version": table.version,
+        "highlight": sorted(index[u] for u in highlight if u in index),
+        "focus": sorted(index[u] for u in focus if u in index),
+    }
+
+
+class GraphPayloadCache:
+    """
+    Encoded payloads keyed by (graph version, query). The full graph is
+    encoded once per version; subgraph/highlight queries are LRU-bounded.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = EncodedPayload(build())
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def version(self, g):
+        return get_node_table(g).version
+
+    def graph(self, g, focus_labels=None, hops=1):
+        version = get_node_table(g).version
+        if not focus_labels:
+            return self.get((version, "full"), lambda: build_graph_payload(g))
+        key = (version, "focus", tuple(sorted(focus_labels)), hops)
+        return self.get(key, lambda: build_graph_payload(g, focus_node_ids(g, focus_labels, hops)))
+
+    def highlight(self, g, labels, hops=1):
+        version = get_node_table(g).version
+        key = (version, "highlight", tuple(sorted(labels)), hops)
+        return self.get(key, lambda: build_highlight_payload(g, labels, hops))
+
+
+def parse_labels(value):
+    """'a,b, c' -> ['a', 'b', 'c'] (None/empty -> [])."""
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+
+def payload_response(request: Request, payload: EncodedPayload, immutable=False):
+    """
+    Returns 304 when the client's ETag matches, otherwise the (gzipped when
+    accepted) body. `immutable` marks version-pinned URLs as cacheable forever.
+    """
+    headers = {
+        "ETag": payload.etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "public, max-age=31536000, immutable" if immutable else "no-cache",
+    }
+    if payload.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=payload.gzipped, media_type="application/json", headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
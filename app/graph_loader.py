@@ -1,9 +1,17 @@
 import rdflib
 import os
+import weakref
+from changeset import replay
+from mention_extractor import MentionExtractor
+
+# id(graph) -> MentionExtractor, built on first use (tenant_graphs.load_tenant
+# for served graphs) and dropped when the graph is garbage collected. TBox and
+# ETL graphs never pay for the automaton.
+_mention_extractors = {}
 
 def load_graph(file_path):
     """
-    Load an RDF graph from a Turtle file.
+    Load an RDF graph from a Turtle file, plus its changeset log if any.
     
     Args:
         file_path (str): The absolute path to the .ttl file.
@@ -14,6 +22,9 @@ def load_graph(file_path):
     g = rdflib.Graph()
     try:
         g.parse(file_path, format="turtle")
+        applied = replay(g, file_path)
+        if applied:
+            print(f"[INFO] Replayed {applied} changeset record(s)")
         print(f"[INFO] Successfully loaded graph from {file_path}")
         print(f"[INFO] Graph scale: {len(g)} triples")
         return g
@@ -21,6 +32,23 @@ def load_graph(file_path):
         print(f"[ERROR] Failed to load graph: {e}")
         return None
 
+def build_mention_extractor(graph):
+    """
+    (Re)builds the label/alias automaton for `graph`. Graphs are treated as
+    immutable once loaded (reloads create new objects), so one build per
+    graph matches its labels.
+    """
+    key = id(graph)
+    if key not in _mention_extractors:
+        weakref.finalize(graph, _mention_extractors.pop, key, None)
+    _mention_extractors[key] = MentionExtractor(graph)
+    return _mention_extractors[key]
+
+def get_mention_extractor(graph):
+    """The extractor for `graph`, built on first use."""
+    extractor = _mention_extractors.get(id(graph))
+    return extractor if extractor is not None else build_mention_extractor(graph)
+
 def generate_schema_info(graph):
     """
     Extracts schema information (Classes, Properties) from the graph
@@ -0,0 +1,102 @@
+from rdflib import Namespace, RDF, RDFS
+
+# Namespaces
+NS = Namespace("http://math.bot/ontology/")
+
+# Graph-only answers
+# Used while the model circuit is open (see model_router.CircuitBreaker):
+# the concepts found by local retrieval (mention automaton + fuzzy label
+# index) are looked up in the graph directly - their Subject > Chapter
+# position and what should be learned before them - and rendered with a
+# template in the usual {answer, evidence} shape. No model call, no SPARQL.
+MAX_CONCEPTS = 3
+MAX_PREREQUISITES = 3
+
+# Child -> parent, walking up Concept -> Section -> Chapter -> Subject
+PARENT_PROPS = (NS.hasConcept, NS.hasSection, NS.hasChapter)
+
+
+def _label(graph, node):
+    label = graph.value(node, RDFS.label)
+    return str(label) if label is not None else None
+
+def hierarchy_of(graph, node):
+    """(subject, chapter) labels above `node`, "Unknown" where missing."""
+    path = {}
+    current = node
+    for prop in PARENT_PROPS:
+        parent = graph.value(None, prop, current)
+        if parent is None:
+            if path:
+                break
+            continue  # `node` may sit higher up (a Section has no hasConcept parent)
+        path[prop] = parent
+        current = parent
+    subject, chapter = (path.get(NS.hasChapter), path.get(NS.hasSection))
+    return tuple((_label(graph, n) if n is not None else None) or "Unknown" for n in (subject, chapter))
+
+def prerequisites_of(graph, node, limit=MAX_PREREQUISITES):
+    """
+    Nodes to learn before `node`: its own prerequisiteOf links (concept-level
+    ones come from the inferred graph), else those of its Section.
+    """
+    pres = sorted(graph.subjects(NS.prerequisiteOf, node))
+    if not pres and (node, RDF.type, NS.Concept) in graph:
+        for section in graph.subjects(NS.hasConcept, node):
+            pres.extend(sorted(graph.subjects(NS.prerequisiteOf, section)))
+    return list(dict.fromkeys(pres))[:limit]
+
+def _seeds(mentions, candidates, limit):
+    """Exact mentions first, then fuzzy hits; one node per label."""
+    seeds = {}
+    for m in mentions or []:
+        if m.uris:
+            seeds.setdefault(m.label, m.uris[0])
+    for uri, label, _ in candidates or []:
+        seeds.setdefault(label, uri)
+    return list(seeds.items())[:limit]
+
+def local_answer(graph, mentions, candidates, max_concepts=MAX_CONCEPTS):
+    """{answer, evidence} built from the graph alone."""
+    evidence = []
+    lines = []
+    for label, node in _seeds(mentions, candidates, max_concepts):
+        subject, chapter = hierarchy_of(graph, node)
+        evidence.append({"subject": subject, "chapter": chapter, "concept": label,
+                         "desc": "질문과 관련된 개념"})
+        line = f"- {label}" + (f": {subject} > {chapter}" if subject != "Unknown" else "")
+
+        pre_labels = []
+        for pre in prerequisites_of(graph, node):
+            pre_label = _label(graph, pre)
+            if not pre_label:
+                continue
+            pre_labels.append(pre_label)
+            pre_subject, pre_chapter = hierarchy_of(graph, pre)
+            evidence.append({"subject": pre_subject, "chapter": pre_chapter, "concept": pre_label,
+                             "desc": f"'{label}'의 선수 학습 개념"})
+        if pre_labels:
+            line += f" (먼저 복습할 개념: {', '.join(pre_labels)})"
+        lines.append(line)
+
+    if not lines:
+        return {
+            "answer": "지금은 AI 답변을 사용할 수 없고, 질문에서 교과 개념을 찾지 못했어요. "
+                      "개념 이름을 넣어 다시 질문하거나 잠시 후 다시 시도해 주세요.",
+            "evidence": [],
+        }
+    answer = "지금은 AI 답변을 사용할 수 없어 온톨로지에서 바로 찾은 내용으로 안내해 드릴게요.\n" + "\n".join(lines)
+    return {"answer": answer, "evidence": evidence}
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+    from graph_loader import load_graph, get_mention_extractor
+    from concept_index import ConceptIndex
+
+    g = load_graph("data/knowledge_graph/math_abox.ttl")
+    index = ConceptIndex(g)
+    question = sys.argv[1] if len(sys.argv) > 1 else "합성함수의 미분법이 어려워"
+    result = local_answer(g, get_mention_extractor(g).find(question), index.search(question, k=3))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -1,17 +1,43 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
+from typing import Optional
+import uuid
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import os
 import sys
+from contextlib import asynccontextmanager
 
 # Add current directory to path so imports work
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Project root (visualize_graph / graph_layout for the graph API)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from reasoning_engine import generate_sparql, execute_sparql, generate_answer
-from graph_loader import load_graph, generate_schema_info
+from reasoning_engine import (generate_sparql, execute_sparql, generate_answer, extract_mentions, local_rows,
+                              model_available, warm_up_models, router, result_cache, plan_cache, answer_cache)
+from deadline import Deadline, DeadlineExceeded
+from model_router import CircuitOpen
+from local_answer import local_answer
+from tenant_graphs import create_tenant_registry, UnknownTenantError, DEFAULT_TENANT
+from visualize_graph import attach_node_table, forget_node_table
+from session_store import create_session_store, format_history
+from graph_api import GraphPayloadCache, parse_labels, payload_response
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Pinned tenants (PINNED_TENANTS, default "default") are loaded before the
+    # server takes requests, while the Gemini client is imported/configured on
+    # a background thread. Done here rather than at import, so importing this
+    # module stays cheap (benchmarks/bench_import.py).
+    warm_up_models()
+    print("Initializing Knowledge Graph...")
+    tenants.warm()
+    # Hot reload: edited ABox/TBox files are rebuilt in the background and swapped in
+    tenants.start_watcher()
+    print("Graph Initialized.")
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for Frontend
 app.add_middleware(
@@ -22,39 +48,91 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load Graph ONCE at startup
-print("Initializing Knowledge Graph...")
-TBOX_PATH = "/Users/hanjaehoon/pythonz/onthology_camp/dongbo_kids/math_bot_proto/data/ontology/math_tbox.ttl"
-DATA_PATH = "/Users/hanjaehoon/pythonz/onthology_camp/dongbo_kids/math_bot_proto/data/knowledge_graph/math_abox.ttl"
+# Per-tenant graph snapshots, loaded on first use (GRAPH_MEMORY_MB budget, LRU).
+# Each request resolves its tenant once and uses that snapshot throughout.
+# Pinned tenants are warmed in `lifespan`.
+tenants = create_tenant_registry(on_evict=lambda t: forget_node_table(t.full_graph),
+                                 on_load=lambda t: setattr(t, "node_table", attach_node_table(t.full_graph)))
+
+def get_tenant(key):
+    try:
+        return tenants.get(key or DEFAULT_TENANT)
+    except UnknownTenantError:
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {key}")
+
+# Multi-turn context (in-process by default, SESSION_STORE=disk to persist)
+session_store = create_session_store()
 
-g = load_graph(DATA_PATH)
-tbox = load_graph(TBOX_PATH)
-full_graph = g + tbox
-schema_info = generate_schema_info(full_graph)
-print("Graph Initialized.")
+# Encoded graph JSON (full graph once per version, subgraphs LRU-cached)
+graph_payloads = GraphPayloadCache()
 
 class ChatRequest(BaseModel):
     message: str
+    session_id: Optional[str] = None
+    tenant: Optional[str] = None
+
+def answer_question(tenant, user_msg, history, mentions, candidates, deadline):
+    """
+    SPARQL generation -> execution -> answer, within `deadline`.
+    Raises CircuitOpen when the model backend is (or becomes) unavailable.
+    """
+    timed_out = False
+    try:
+        sparql_res = generate_sparql(user_msg, tenant.schema_info, history, candidates, mentions,
+                                     deadline=deadline)
+        print(f"[SPARQL] {sparql_res.get('query')}")
+    except DeadlineExceeded as e:
+        print(f"[WARN] {e}; using local retrieval after {deadline.elapsed():.2f}s")
+        sparql_res = {"query": "", "explanation": ""}
+        timed_out = True
+    
+    # Execution (local retrieval if no query ran in time)
+    db_res = []
+    if sparql_res.get('query'):
+        try:
+            db_res = execute_sparql(sparql_res['query'], tenant.query_graph, deadline=deadline)
+            print(f"[DB] Found {len(db_res)} rows")
+        except DeadlineExceeded as e:
+            print(f"[WARN] {e} after {deadline.elapsed():.2f}s")
+            timed_out = True
+    if timed_out:
+        db_res = local_rows(mentions, candidates)
+        
+    # Answer Generation (templated if the deadline is reached)
+    return generate_answer(user_msg, db_res, sparql_res.get('explanation', ''), history, deadline=deadline)
 
 @app.post("/chat")
-async def chat(request: ChatRequest):
+def chat(request: ChatRequest):
+    # Plain def: FastAPI runs it on its thread pool, so the blocking tenant
+    # load and model pipeline never stall the event loop (/graph, /stats).
+    tenant = get_tenant(request.tenant)
+    # End-to-end budget (CHAT_DEADLINE); stages that run out of time degrade
+    deadline = Deadline()
     try:
         user_msg = request.message
+        session_id = request.session_id or uuid.uuid4().hex
+        history = format_history(session_store.get(session_id))
         print(f"[User] {user_msg}")
         
-        # 1. Reasoning
-        sparql_res = generate_sparql(user_msg, schema_info)
-        print(f"[SPARQL] {sparql_res.get('query')}")
+        # 1. Local retrieval (no model call)
+        mentions = extract_mentions(user_msg, tenant.mention_extractor)
+        candidates = tenant.concept_index.search(user_msg, k=5)
         
-        # 2. Execution
-        if sparql_res.get('query'):
-            db_res = execute_sparql(sparql_res['query'], full_graph)
-            print(f"[DB] Found {len(db_res)} rows")
-        else:
-            db_res = []
-            
-        # 3. Answer Generation
-        final_response = generate_answer(user_msg, db_res, sparql_res.get('explanation', ''))
+        # 2. Model pipeline, or a graph-only answer while the model circuit is open
+        final_response = None
+        if model_available():
+            try:
+                final_response = answer_question(tenant, user_msg, history, mentions, candidates, deadline)
+            except CircuitOpen:
+                pass
+        if final_response is None:
+            print("[WARN] Model circuit open, answering from the local graph")
+            final_response = local_answer(tenant.query_graph, mentions, candidates)
+        
+        # 3. Remember the turn (older turns are compacted into a summary)
+        session_store.append(session_id, "user", user_msg)
+        session_store.append(session_id, "assistant", final_response.get("answer", ""))
+        final_response["session_id"] = session_id
         
         return final_response
             
@@ -65,5 +143,39 @@ async def chat(request: ChatRequest):
             "evidence": []
         }
 
+@app.get("/graph")
+def graph(request: Request, focus: Optional[str] = None, hops: int = 1, version: Optional[str] = None,
+          tenant: Optional[str] = None):
+    """
+    Ontology graph as compact JSON for client-side rendering.
+    `focus=label1,label2` returns only the ego-subgraph around those labels.
+    Pass the current `version` to get a response cacheable forever.
+    """
+    hops = max(0, min(hops, 3))
+    full_graph = get_tenant(tenant).full_graph
+    payload = graph_payloads.graph(full_graph, parse_labels(focus), hops)
+    return payload_response(request, payload, immutable=version == graph_payloads.version(full_graph))
+
+@app.get("/graph/highlight")
+def graph_highlight(request: Request, labels: str, hops: int = 1, tenant: Optional[str] = None):
+    """
+    Per-answer delta against a cached /graph: integer IDs to highlight and
+    the focused subgraph IDs.
+    """
+    hops = max(0, min(hops, 3))
+    payload = graph_payloads.highlight(get_tenant(tenant).full_graph, parse_labels(labels), hops)
+    return payload_response(request, payload)
+
+@app.get("/stats")
+def stats():
+    """Cache hit rates, model health and loaded tenants, for monitoring."""
+    return {
+        "sparql_cache": result_cache.stats(),
+        "sparql_plan_cache": plan_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "models": router.report(),
+        "tenants": tenants.stats(),
+    }
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
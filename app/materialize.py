@@ -0,0 +1,134 @@
+import os
+import sys
+import hashlib
+import rdflib
+from rdflib import Namespace, URIRef, Literal, RDF, RDFS
+
+from changeset import changes_path
+
+# Namespaces
+NS = Namespace("http://math.bot/ontology/")
+INFERRED_GRAPH = URIRef("http://math.bot/graph/inferred")
+
+# Build-time materialization
+# Inferred triples live in their own named graph, written next to the ABox:
+#   data/knowledge_graph/math_abox.ttl           <- asserted
+#   data/knowledge_graph/math_abox.inferred.trig <- GRAPH <.../graph/inferred>
+# The default graph of the TriG file records which sources the inferences
+# were derived from (:derivedFrom fingerprint), so a stale file is detected
+# and regenerated instead of being served.
+#
+# Rules:
+#   - rdfs:subClassOf closure, rdfs:domain / rdfs:range typing (rdfs2/3/9/11)
+#   - Section prerequisites reach their concepts:
+#       S1 :prerequisiteOf S2, S1 :hasConcept c1, S2 :hasConcept c2
+#       => c1 :prerequisiteOf c2
+
+def inferred_path(abox_path):
+    root, _ = os.path.splitext(abox_path)
+    return root + ".inferred.trig"
+
+def source_fingerprint(abox_path, tbox_path):
+    """Content hash of the ABox (+ its changeset log) and the TBox."""
+    h = hashlib.sha256()
+    for path in (abox_path, changes_path(abox_path), tbox_path):
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                h.update(f.read())
+        h.update(b"\0")
+    return h.hexdigest()
+
+def _superclasses(tbox):
+    """class -> every (transitive) superclass, excluding itself."""
+    direct = {}
+    for sub, sup in tbox.subject_objects(RDFS.subClassOf):
+        direct.setdefault(sub, set()).add(sup)
+    closure = {}
+    for cls in direct:
+        seen, stack = set(), list(direct[cls])
+        while stack:
+            sup = stack.pop()
+            if sup not in seen and sup != cls:
+                seen.add(sup)
+                stack.extend(direct.get(sup, ()))
+        closure[cls] = seen
+    return closure
+
+def materialize(abox, tbox):
+    """Returns a Graph with the inferred triples not already asserted in `abox`."""
+    inferred = rdflib.Graph()
+    supers = _superclasses(tbox)
+
+    # 1. Types: asserted types + domain/range, then superclasses
+    types = {}
+    for s, cls in abox.subject_objects(RDF.type):
+        types.setdefault(s, set()).add(cls)
+    for prop, domain in tbox.subject_objects(RDFS.domain):
+        for s in abox.subjects(prop, None):
+            types.setdefault(s, set()).add(domain)
+    for prop, rng in tbox.subject_objects(RDFS.range):
+        for o in abox.objects(None, prop):
+            if not isinstance(o, Literal):
+                types.setdefault(o, set()).add(rng)
+    for node, classes in types.items():
+        for cls in set(classes):
+            classes |= supers.get(cls, set())
+        for cls in classes:
+            if (node, RDF.type, cls) not in abox:
+                inferred.add((node, RDF.type, cls))
+
+    # 2. Section-level prerequisites pushed down to concepts
+    for pre_sec, post_sec in abox.subject_objects(NS.prerequisiteOf):
+        pre_concepts = list(abox.objects(pre_sec, NS.hasConcept))
+        post_concepts = list(abox.objects(post_sec, NS.hasConcept))
+        for c1 in pre_concepts:
+            for c2 in post_concepts:
+                if c1 != c2 and (c1, NS.prerequisiteOf, c2) not in abox:
+                    inferred.add((c1, NS.prerequisiteOf, c2))
+    return inferred
+
+def write_inferred(inferred, path, fingerprint):
+    dataset = rdflib.Dataset()
+    dataset.bind("", NS)
+    graph = dataset.graph(INFERRED_GRAPH)
+    for triple in inferred:
+        graph.add(triple)
+    dataset.add((INFERRED_GRAPH, NS.derivedFrom, Literal(fingerprint)))
+    dataset.add((INFERRED_GRAPH, RDFS.comment, Literal("Generated by app/materialize.py; do not edit.")))
+    tmp_path = path + ".tmp"
+    dataset.serialize(destination=tmp_path, format="trig")
+    os.replace(tmp_path, path)
+
+def build_inferred(abox_path, tbox_path, abox=None, tbox=None):
+    """Materializes and writes the inferred graph. Returns it."""
+    from graph_loader import load_graph
+    abox = abox if abox is not None else load_graph(abox_path)
+    tbox = tbox if tbox is not None else load_graph(tbox_path)
+    inferred = materialize(abox, tbox)
+    write_inferred(inferred, inferred_path(abox_path), source_fingerprint(abox_path, tbox_path))
+    print(f"[INFO] Materialized {len(inferred)} inferred triples -> {inferred_path(abox_path)}")
+    return inferred
+
+def load_inferred(abox_path, tbox_path, abox, tbox):
+    """
+    The inferred graph for these sources: read from disk when its fingerprint
+    matches, otherwise recomputed (and rewritten) from `abox` + `tbox`.
+    """
+    path = inferred_path(abox_path)
+    if os.path.exists(path):
+        dataset = rdflib.Dataset()
+        dataset.parse(path, format="trig")
+        stored = dataset.value(INFERRED_GRAPH, NS.derivedFrom)
+        if stored is not None and str(stored) == source_fingerprint(abox_path, tbox_path):
+            inferred = rdflib.Graph()
+            for triple in dataset.graph(INFERRED_GRAPH):
+                inferred.add(triple)
+            return inferred
+        print(f"[WARN] {path} is stale; re-materializing.")
+    return build_inferred(abox_path, tbox_path, abox, tbox)
+
+if __name__ == "__main__":
+    # Usage: python app/materialize.py [abox.ttl] [tbox.ttl]
+    abox_file = sys.argv[1] if len(sys.argv) > 1 else "data/knowledge_graph/math_abox.ttl"
+    tbox_file = sys.argv[2] if len(sys.argv) > 2 else "data/ontology/math_tbox.ttl"
+    build_inferred(abox_file, tbox_file)
@@ -0,0 +1,162 @@
+import os
+import unicodedata
+from collections import deque
+from rdflib import RDFS
+
+# Curated synonyms (see the file header for the format)
+ALIASES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "data/ontology/aliases.md")
+
+# Ontology mention extraction
+# An Aho-Corasick automaton over every rdfs:label plus the alias table finds
+# all mentions in a question in one pass over its characters. Matching
+# ignores case and whitespace ("합성 함수" == "합성함수"); reported spans
+# point back into the original text.
+
+def _fold(ch):
+    return unicodedata.normalize("NFC", ch).lower()
+
+def normalize_key(text):
+    return "".join(_fold(ch) for ch in unicodedata.normalize("NFC", str(text)) if not ch.isspace())
+
+def load_aliases(path=ALIASES_FILE):
+    """{alias: canonical label} from lines 'label -> alias, alias'."""
+    aliases = {}
+    if not os.path.exists(path):
+        return aliases
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or line.startswith("Format") or "->" not in line:
+                continue
+            label, alias_part = line.split("->", 1)
+            for alias in alias_part.split(","):
+                if alias.strip():
+                    aliases[alias.strip()] = label.strip()
+    return aliases
+
+
+class Mention:
+    """One match: text[start:end] refers to ontology `label` (via `alias` if not None)."""
+
+    def __init__(self, start, end, surface, label, uris, alias=None):
+        self.start = start
+        self.end = end
+        self.surface = surface
+        self.label = label
+        self.uris = uris
+        self.alias = alias
+
+    def __repr__(self):
+        via = f" via '{self.alias}'" if self.alias else ""
+        return f"Mention({self.surface!r} -> {self.label!r}{via} @{self.start}:{self.end})"
+
+
+class MentionExtractor:
+    """
+    Aho-Corasick automaton over the graph's labels and aliases.
+
+    Usage:
+        extractor = MentionExtractor(graph)
+        extractor.find("순간변화율이랑 도함수 차이")
+        # -> [Mention('순간변화율' -> '미분계수' via '순간변화율'), Mention('도함수' -> '도함수')]
+    """
+
+    def __init__(self, graph, aliases=None):
+        label_uris = {}
+        for s, lbl in graph.subject_objects(RDFS.label):
+            label_uris.setdefault(str(lbl), []).append(s)
+
+        # pattern key -> (label, alias or None); labels win over aliases
+        patterns = {}
+        for alias, label in (load_aliases() if aliases is None else aliases).items():
+            if label in label_uris:
+                patterns[normalize_key(alias)] = (label, alias)
+        for label in label_uris:
+            patterns[normalize_key(label)] = (label, None)
+        patterns.pop("", None)
+
+        self.label_uris = {label: sorted(uris) for label, uris in label_uris.items()}
+        self._build(patterns)
+
+    def _build(self, patterns):
+        # Trie as parallel lists: goto[state] = {char: state}
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]  # state -> [(pattern length, label, alias)]
+        for key, (label, alias) in patterns.items():
+            state = 0
+            for ch in key:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append((len(key), label, alias))
+
+        # BFS for failure links; outputs of the fail state are merged in
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                if state:
+                    f = self.fail[state]
+                    while f and ch not in self.goto[f]:
+                        f = self.fail[f]
+                    self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find_all(self, text):
+        """Every (possibly overlapping) mention, in order of end position."""
+        positions = []  # folded index -> original index
+        mentions = []
+        state = 0
+        for i, raw in enumerate(text):
+            if raw.isspace():
+                continue
+            ch = _fold(raw)
+            positions.append(i)
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for length, label, alias in self.out[state]:
+                start = positions[len(positions) - length]
+                mentions.append(Mention(start, i + 1, text[start:i + 1], label,
+                                        self.label_uris[label], alias))
+        return mentions
+
+    def find(self, text):
+        """
+        Non-overlapping mentions, preferring the longest (so '합성함수의 미분법'
+        is reported instead of '합성함수' + '미분법'), in text order.
+        """
+        chosen = []
+        taken = [False] * len(text)
+        for m in sorted(self.find_all(text), key=lambda m: (-(m.end - m.start), m.start)):
+            if not any(taken[m.start:m.end]):
+                chosen.append(m)
+                for i in range(m.start, m.end):
+                    taken[i] = True
+        return sorted(chosen, key=lambda m: m.start)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from graph_loader import load_graph, get_mention_extractor
+
+    g = load_graph("data/knowledge_graph/math_abox.ttl")
+    extractor = get_mention_extractor(g)
+    print(f"[INFO] Automaton: {len(extractor.goto)} states")
+
+    questions = sys.argv[1:] or ["순간변화율이랑 도함수는 뭐가 달라?",
+                                 "합성 함수의 미분법에서 체인룰 쓰는 법",
+                                 "라디안이랑 삼각함수의 그래프"]
+    for q in questions:
+        start = time.perf_counter()
+        found = extractor.find(q)
+        print(f"{q!r} ({(time.perf_counter() - start) * 1000:.3f} ms): {found}")
@@ -0,0 +1,589 @@
+import time
+import random
+import hashlib
+import datetime
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeout
+
+# Routing Policies
+# - "fastest":   cheap, structured stages (SPARQL generation) go to the
+#                healthy model with the lowest rolling median latency.
+# - "preferred": quality-sensitive stages (answer prose) try models in the
+#                configured order; later entries are failover only.
+POLICY_FASTEST = "fastest"
+POLICY_PREFERRED = "preferred"
+
+# Hedged requests
+# A call still running after the model's HEDGE_QUANTILE latency gets a
+# duplicate; the first success wins and the other is cancelled (a call that
+# already started cannot be interrupted, its result is just discarded).
+# Every call earns `max_hedge_rate` tokens and a hedge spends one, so at most
+# that fraction of traffic is duplicated.
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+
+# Abandoned calls
+# A call given up at the caller's deadline (or a losing hedge) keeps its
+# worker thread until the backend returns. At most `max_abandoned` such calls
+# (default: half the pool) may be in flight; beyond that, calls with a
+# deadline fail fast with CallTimeout and no hedges are fired, so live calls
+# never queue behind abandoned ones and burn their deadline waiting.
+
+# Prefixes below this size are sent inline instead of as cached content
+# (~1024 tokens, the smallest context cache Gemini accepts, at ~4 B/token)
+MIN_CACHE_BYTES = 4096
+
+
+class CallTimeout(TimeoutError):
+    """No model answered within the caller's timeout (no failover is tried)."""
+
+
+class CircuitOpen(RuntimeError):
+    """The circuit breaker is open: no model call is attempted."""
+
+
+def _time_left(expires):
+    return None if expires is None else max(0.0, expires - time.monotonic())
+
+
+class ModelStats:
+    """
+    Rolling latency / error statistics for a single model.
+    """
+
+    def __init__(self, window=50, max_error_rate=0.5, max_consecutive_failures=3, cooldown=30.0):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = success, False = failure
+        self.max_error_rate = max_error_rate
+        self.max_consecutive_failures = max_consecutive_failures
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.degraded_until = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record_success(self, latency):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.calls += 1
+
+    def record_failure(self, latency):
+        self.latencies.append(latency)
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self.calls += 1
+        self.failures += 1
+        if (self.consecutive_failures >= self.max_consecutive_failures
+                or self.error_rate() > self.max_error_rate):
+            # Take the model out of rotation for a while, then let it retry.
+            self.degraded_until = time.monotonic() + self.cooldown
+            self.consecutive_failures = 0
+            self.outcomes.clear()
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def percentile(self, q):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        idx = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[idx]
+
+    def is_healthy(self):
+        return time.monotonic() >= self.degraded_until
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate(), 3),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "healthy": self.is_healthy(),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class HedgeBudget:
+    """
+    Token bucket capping hedges to `rate` of all calls (with up to `burst`
+    hedges saved up).
+    """
+
+    def __init__(self, rate=0.1, burst=5.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.rate)
+
+    def spend(self):
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            self.denied += 1
+            return False
+
+
+class CircuitBreaker:
+    """
+    Breaker around the whole model backend (all candidates of a stage).
+
+    closed    -> calls go through; `failure_threshold` consecutive failed
+                 router calls open it (a call abandoned at the caller's
+                 deadline is no verdict on the backend and does not count)
+    open      -> calls fail fast with CircuitOpen for `reset_timeout` seconds
+    half_open -> a single probe call goes through; success closes the
+                 circuit, failure opens it again
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        # Caller holds the lock
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+
+    def available(self):
+        """Whether a call would be let through now (does not claim the probe)."""
+        with self._lock:
+            self._refresh()
+            return self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self._probing)
+
+    def allow(self):
+        """Claims permission for one call (the probe, when half-open)."""
+        with self._lock:
+            self._refresh()
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                print("[BREAKER] Half-open: probing the model backend")
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print("[BREAKER] Closed: model backend recovered")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """The call ended without a verdict: frees the half-open probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    print(f"[BREAKER] Open: failing fast for {self.reset_timeout:.0f}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.failures = 0
+                self._probing = False
+
+    def snapshot(self):
+        with self._lock:
+            self._refresh()
+            return {"state": self.state, "failures": self.failures, "trips": self.trips, "rejected": self.rejected}
+
+
+class GeminiBackend:
+    """
+    Thin wrapper around genai.GenerativeModel so the router only sees
+    `generate(prompt, prefix=None) -> str`.
+
+    A static `prefix` is uploaded once as provider-side cached content
+    (genai.caching) and reused until its TTL runs out. Models that do not
+    support caching (or prefixes under the provider's minimum size) fall back
+    to sending the prefix as `system_instruction`.
+
+    At most `max_prefixes` prefixes are kept (LRU); evicted or expired
+    cached contents are deleted on the provider side. Prefixes shorter than
+    `min_cache_bytes` (a rough stand-in for the provider's minimum cacheable
+    token count) are never uploaded.
+
+    google.generativeai (~1 s to import) is loaded on first use, after
+    calling `setup` (e.g. to set the API key), not when the backend is built.
+    """
+
+    def __init__(self, model_name, generation_config=None, cache_ttl=3600, setup=None,
+                 max_prefixes=8, min_cache_bytes=MIN_CACHE_BYTES):
+        self.name = model_name
+        self.generation_config = generation_config
+        self.cache_ttl = cache_ttl
+        self.setup = setup
+        self.max_prefixes = max_prefixes
+        self.min_cache_bytes = min_cache_bytes
+        self.genai = None
+        self.model = None
+        self._prefixed = OrderedDict()  # sha256(prefix) -> (model, cached content or None, expires_at)
+        self._lock = threading.Lock()
+
+    def client(self):
+        """Imports genai and builds the base model once; returns the genai module."""
+        with self._lock:
+            if self.model is None:
+                if self.setup:
+                    self.setup()
+                import google.generativeai as genai
+                self.model = genai.GenerativeModel(self.name, generation_config=self.generation_config)
+                self.genai = genai
+            return self.genai
+
+    def _model_for(self, prefix):
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        size = len(prefix.encode("utf-8"))
+        stale = []
+        with self._lock:
+            entry = self._prefixed.get(key)
+            if entry and entry[2] > time.monotonic():
+                self._prefixed.move_to_end(key)
+                return entry[0], entry[1] is not None
+            if entry:
+                stale.append(self._prefixed.pop(key)[1])
+
+            genai = self.genai
+            cache = None
+            if size >= self.min_cache_bytes:
+                try:
+                    cache = genai.caching.CachedContent.create(
+                        model=f"models/{self.name}",
+                        display_name=f"prefix-{key[:12]}",
+                        system_instruction=prefix,
+                        ttl=datetime.timedelta(seconds=self.cache_ttl),
+                    )
+                    model = genai.GenerativeModel.from_cached_content(cache, generation_config=self.generation_config)
+                    print(f"[CACHE] {self.name}: created cached prefix {key[:12]} ({size} B)")
+                except Exception as e:
+                    print(f"[WARN] {self.name}: context caching unavailable ({e}); using system_instruction.")
+                    cache = None
+            if cache is None:
+                model = genai.GenerativeModel(self.name, generation_config=self.generation_config,
+                                              system_instruction=prefix)
+
+            # Refresh a minute before the provider drops the cache. Inline
+            # prefixes (too small, or caching failed) are retried once per TTL.
+            self._prefixed[key] = (model, cache, time.monotonic() + max(self.cache_ttl - 60, 1))
+            while len(self._prefixed) > self.max_prefixes:
+                stale.append(self._prefixed.popitem(last=False)[1][1])
+
+        for old in stale:
+            self._delete_cache(old)
+        return model, cache is not None
+
+    def _delete_cache(self, cache):
+        if cache is None:
+            return
+        try:
+            cache.delete()
+        except Exception as e:
+            print(f"[WARN] {self.name}: could not delete cached prefix {cache.name} ({e})")
+
+    def generate(self, prompt, prefix=None):
+        self.client()
+        if prefix:
+            model, cached = self._model_for(prefix)
+        else:
+            model, cached = self.model, False
+
+        sent = len(prompt.encode("utf-8"))
+        static = len(prefix.encode("utf-8")) if prefix else 0
+        if not cached:
+            sent += static
+        print(f"[PROMPT] {self.name}: sent {sent} B (dynamic {len(prompt.encode('utf-8'))} B, "
+              f"static {static} B {'cached' if cached else 'inline'})")
+
+        response = model.generate_content(prompt)
+        return response.text
+
+
+class StubBackend:
+    """
+    Fake backend for exercising the routing policy offline.
+    `latency` is (mean, jitter) in seconds, `fail_rate` is 0.0 ~ 1.0.
+    `tail` is (probability, factor): that share of calls takes `factor`
+    times longer, for a heavy-tailed latency distribution.
+    """
+
+    def __init__(self, name, latency=(0.01, 0.0), fail_rate=0.0, response='{"query": "", "explanation": "stub"}',
+                 tail=(0.0, 1.0)):
+        self.name = name
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.response = response
+        self.tail = tail
+
+    def generate(self, prompt, prefix=None):
+        mean, jitter = self.latency
+        delay = max(0.0, random.uniform(mean - jitter, mean + jitter))
+        if random.random() < self.tail[0]:
+            delay *= self.tail[1]
+        time.sleep(delay)
+        if random.random() < self.fail_rate:
+            raise RuntimeError(f"{self.name} stub failure")
+        return self.response
+
+
+class ModelRouter:
+    """
+    Routes each pipeline stage to a model based on per-model rolling stats
+    and fails over to the next candidate when a call raises.
+
+    Args:
+        backends (dict): model name -> backend with `generate(prompt)`.
+        stages (dict): stage name -> {"policy": ..., "models": [names],
+            "hedge": bool}.
+        hedge_quantile (float): latency percentile after which a duplicate
+            call is fired (stages with "hedge": True).
+        max_hedge_rate (float): upper bound on hedged calls / all calls.
+        hedge_min_samples (int): latencies needed before a model is hedged.
+        breaker (CircuitBreaker): shared by every stage (None for a default one).
+        max_abandoned (int): abandoned calls allowed to hold workers (None =
+            max_workers // 2).
+    """
+
+    def __init__(self, backends, stages, hedge_quantile=HEDGE_QUANTILE, max_hedge_rate=0.1,
+                 hedge_min_samples=HEDGE_MIN_SAMPLES, max_workers=32, breaker=None, max_abandoned=None,
+                 **stats_kwargs):
+        self.backends = backends
+        self.stages = stages
+        self.stats = {name: ModelStats(**stats_kwargs) for name in backends}
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_budget = HedgeBudget(max_hedge_rate)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_abandoned = max_workers // 2 if max_abandoned is None else max_abandoned
+        self.abandoned = 0
+        self.saturated = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-call")
+        self._lock = threading.Lock()
+
+    def candidates(self, stage):
+        """
+        Returns the model names to try for `stage`, best first.
+        Degraded models are moved to the end rather than dropped so a stage
+        still has something to try when every model is unhealthy.
+        """
+        config = self.stages[stage]
+        names = [n for n in config["models"] if n in self.backends]
+
+        with self._lock:
+            if config.get("policy") == POLICY_FASTEST:
+                # Unmeasured models sort first so they get sampled once.
+                def sort_key(name):
+                    p50 = self.stats[name].percentile(0.5)
+                    return -1.0 if p50 is None else p50
+                names = sorted(names, key=sort_key)
+
+            healthy = [n for n in names if self.stats[n].is_healthy()]
+            degraded = [n for n in names if n not in healthy]
+        return healthy + degraded
+
+    def generate(self, stage, prompt, prefix=None, timeout=None):
+        """
+        Generates text for `stage`, failing over across candidates.
+        `prefix` is the static part of the prompt (see GeminiBackend).
+        Returns (text, model_name). Raises the last error if all fail, or
+        CallTimeout once `timeout` seconds have passed (the abandoned call
+        keeps running in the background and still updates the stats).
+        Raises CircuitOpen at once while the breaker is open.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpen("model backend unavailable (circuit open)")
+        try:
+            result = self._generate(stage, prompt, prefix, timeout)
+        except CallTimeout:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _generate(self, stage, prompt, prefix, timeout):
+        hedge = self.stages[stage].get("hedge", False)
+        expires = None if timeout is None else time.monotonic() + timeout
+        if expires is not None and self._saturated():
+            raise CallTimeout(f"{self.abandoned} abandoned model calls still running")
+        last_error = None
+        for name in self.candidates(stage):
+            start = time.perf_counter()
+            try:
+                if hedge:
+                    text = self._call_hedged(name, prompt, prefix, expires)
+                elif expires is None:
+                    text = self._call(name, prompt, prefix)
+                else:
+                    text = self._result(self._executor.submit(self._call, name, prompt, prefix), expires)
+            except CallTimeout:
+                print(f"[ROUTER] {stage}: {name} still running after {time.perf_counter() - start:.2f}s, "
+                      f"deadline reached")
+                raise
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                print(f"[ROUTER] {stage}: {name} failed after {elapsed:.2f}s ({e}), failing over")
+                last_error = e
+                continue
+            return text, name
+
+        raise last_error or RuntimeError(f"No model configured for stage '{stage}'")
+
+    def _call(self, name, prompt, prefix):
+        """One backend call, recorded in the model's stats."""
+        start = time.perf_counter()
+        try:
+            text = self.backends[name].generate(prompt, prefix=prefix)
+        except Exception:
+            with self._lock:
+                self.stats[name].record_failure(time.perf_counter() - start)
+            raise
+        with self._lock:
+            self.stats[name].record_success(time.perf_counter() - start)
+        return text
+
+    def _result(self, future, expires):
+        try:
+            return future.result(timeout=_time_left(expires))
+        except FuturesTimeout:
+            self._abandon(future)
+            raise CallTimeout("model call timed out")
+
+    def _abandon(self, future):
+        """Gives up on `future`; if it already started, it counts until it ends."""
+        if future.cancel():
+            return
+        with self._lock:
+            self.abandoned += 1
+        future.add_done_callback(self._release)
+
+    def _release(self, future):
+        with self._lock:
+            self.abandoned -= 1
+
+    def _saturated(self):
+        with self._lock:
+            if self.abandoned < self.max_abandoned:
+                return False
+            self.saturated += 1
+            return True
+
+    def hedge_delay(self, name):
+        """Seconds to wait before hedging a call to `name` (None = too few samples)."""
+        with self._lock:
+            stats = self.stats[name]
+            if len(stats.latencies) < self.hedge_min_samples:
+                return None
+            return stats.percentile(self.hedge_quantile)
+
+    def _call_hedged(self, name, prompt, prefix, expires=None):
+        """
+        Calls `name`; if it is still running after hedge_delay(name) and the
+        budget allows, fires a duplicate and returns the first success.
+        Raises when every started call failed, or CallTimeout at `expires`.
+        """
+        self.hedge_budget.earn()
+        delay = self.hedge_delay(name)
+        primary = self._executor.submit(self._call, name, prompt, prefix)
+        if delay is None:
+            return self._result(primary, expires)
+
+        left = _time_left(expires)
+        done, _ = wait([primary], timeout=delay if left is None else min(delay, left))
+        if done or (left is not None and left <= delay) or self._saturated() or not self.hedge_budget.spend():
+            return self._result(primary, expires)
+
+        with self._lock:
+            self.stats[name].hedges += 1
+        pending = {primary, self._executor.submit(self._call, name, prompt, prefix)}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=_time_left(expires), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    self._abandon(future)
+                raise CallTimeout("model call timed out")
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                for loser in pending:
+                    self._abandon(loser)
+                if future is not primary:
+                    with self._lock:
+                        self.stats[name].hedge_wins += 1
+                return future.result()
+        raise error
+
+    def report(self):
+        with self._lock:
+            report = {name: s.snapshot() for name, s in self.stats.items()}
+        report["breaker"] = self.breaker.snapshot()
+        report["hedge_budget"] = {"tokens": round(self.hedge_budget.tokens, 2), "denied": self.hedge_budget.denied}
+        with self._lock:
+            report["abandoned"] = {"running": self.abandoned, "max": self.max_abandoned, "saturated": self.saturated}
+        return report
+
+
+if __name__ == "__main__":
+    # Policy check with stub backends (no API key needed)
+    backends = {
+        "fast-lite": StubBackend("fast-lite", latency=(0.01, 0.005)),
+        "fast": StubBackend("fast", latency=(0.03, 0.005)),
+        "strong": StubBackend("strong", latency=(0.08, 0.01)),
+    }
+    router = ModelRouter(backends, {
+        "sparql": {"policy": POLICY_FASTEST, "models": ["fast", "fast-lite", "strong"]},
+        "answer": {"policy": POLICY_PREFERRED, "models": ["strong", "fast"]},
+    }, cooldown=0.5)
+
+    for _ in range(10):
+        router.generate("sparql", "q")
+        router.generate("answer", "q")
+    print("[CHECK] sparql ->", router.candidates("sparql")[0])
+    print("[CHECK] answer ->", router.candidates("answer")[0])
+
+    # Degrade the strong model and confirm answer traffic fails over.
+    backends["strong"].fail_rate = 1.0
+    used = [router.generate("answer", "q")[1] for _ in range(5)]
+    print("[CHECK] answer during outage ->", used)
+
+    # After cooldown the strong model is retried again.
+    backends["strong"].fail_rate = 0.0
+    time.sleep(0.6)
+    print("[CHECK] answer after recovery ->", router.generate("answer", "q")[1])
+    print(router.report())
@@ -0,0 +1,302 @@
+import re
+import itertools
+import threading
+import weakref
+from collections import OrderedDict
+from rdflib import Literal
+
+# SPARQL result cache
+# LLM-generated queries repeat with cosmetic differences (spacing, PREFIX
+# blocks vs. full IRIs, ?x vs ?concept), so entries are keyed on a
+# canonical form of the query:
+#   - comments and whitespace dropped, keywords upper-cased
+#   - PREFIX declarations removed and prefixed names expanded to full IRIs
+#   - variables renamed ?v0, ?v1, ... in order of first appearance
+# Rows are stored under the canonical variable names and renamed back to
+# the caller's names on a hit.
+#
+# Every entry is tagged with the graph it was computed on (a token assigned
+# per graph object). A hot reload creates a new graph, so old entries are
+# never served again; they are dropped as soon as the old graph is freed.
+
+_TOKEN = re.compile(r'''
+    (?P<string>"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\'
+              |"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<iri><[^<>"{}|^`\\\s]*>)
+  | (?P<var>[?$][^\s(){}.,;!=<>+\-*/|&^'"\[\]]+)
+  | (?P<comment>\#[^\n]*)
+  | (?P<pname>(?:[^\W\d_][\w.\-]*)?:[^\s(){},;'"<>\[\]]*(?<!\.))
+  | (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<word>[^\W\d][\w]*)
+  | (?P<other>\S)
+''', re.X)
+
+
+def canonicalize_query(query):
+    """
+    Returns (canonical_text, var_map) where var_map maps the query's variable
+    names (without '?') to canonical names ('v0', 'v1', ...).
+    """
+    tokens = [(m.lastgroup, m.group()) for m in _TOKEN.finditer(query) if m.lastgroup != "comment"]
+
+    # PREFIX p: <iri> declarations
+    prefixes = {}
+    kept = []
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if (kind == "word" and text.upper() == "PREFIX" and i + 2 < len(tokens)
+                and tokens[i + 1][0] == "pname" and tokens[i + 2][0] == "iri"):
+            prefixes[tokens[i + 1][1].rstrip(":")] = tokens[i + 2][1][1:-1]
+            i += 3
+            continue
+        kept.append((kind, text))
+        i += 1
+
+    var_map = {}
+    out = []
+    for kind, text in kept:
+        if kind == "var":
+            name = text[1:]
+            if name not in var_map:
+                var_map[name] = f"v{len(var_map)}"
+            out.append("?" + var_map[name])
+        elif kind == "pname":
+            prefix, local = text.split(":", 1)
+            out.append(f"<{prefixes[prefix]}{local}>" if prefix in prefixes else text)
+        elif kind == "word" and text != "a":
+            out.append(text.upper())
+        else:
+            out.append(text)
+    return " ".join(out), var_map
+
+
+_graph_tokens = {}  # id(graph) -> token
+_token_counter = itertools.count(1)
+_token_lock = threading.Lock()
+
+def graph_token(graph, on_release=None):
+    """Stable token for a graph object (new object, e.g. after reload -> new token)."""
+    key = id(graph)
+    with _token_lock:
+        token = _graph_tokens.get(key)
+        if token is None:
+            token = next(_token_counter)
+            _graph_tokens[key] = token
+            weakref.finalize(graph, _release_token, key, token, on_release)
+    return token
+
+def _release_token(key, token, on_release):
+    with _token_lock:
+        if _graph_tokens.get(key) == token:
+            del _graph_tokens[key]
+    if on_release:
+        on_release(token)
+
+
+def _rows_size(rows):
+    """Rough retained size of a row list (dict + str objects)."""
+    size = 56 + 8 * len(rows)
+    for row in rows:
+        size += 232
+        for k, v in row.items():
+            size += 50 + len(k) + (50 + 2 * len(v) if v is not None else 0)
+    return size
+
+
+class QueryResultCache:
+    """
+    LRU of query results, bounded by an estimated byte budget.
+
+    Usage:
+        rows = cache.get(graph, query)
+        if rows is None:
+            rows = run(query)
+            cache.put(graph, query, rows)
+    """
+
+    def __init__(self, max_bytes=64 << 20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (token, canonical) -> (rows, size)
+        self._lock = threading.Lock()
+
+    def _key(self, graph, query):
+        canonical, var_map = canonicalize_query(query)
+        return (graph_token(graph, self.drop_graph), canonical), var_map
+
+    def get(self, graph, query):
+        key, var_map = self._key(graph, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        names = {canon: name for name, canon in var_map.items()}
+        return [{names.get(k, k): v for k, v in row.items()} for row in entry[0]]
+
+    def put(self, graph, query, rows):
+        key, var_map = self._key(graph, query)
+        stored = [{var_map.get(k, k): v for k, v in row.items()} for row in rows]
+        size = _rows_size(stored)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (stored, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def drop_graph(self, token):
+        """Removes every entry computed on the graph with this token."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == token]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Parsed-query (algebra) cache
+# Parsing + algebra translation dominates graph.query() for our small graph,
+# and generated queries mostly differ only in their string literals (the
+# regex terms). Plain string literals are lifted out as ?__litN variables;
+# the template is parsed once and later queries bind their literals through
+# initBindings. Templates that cannot take a variable in a lifted position
+# (e.g. VALUES data, GROUP_CONCAT separator) are cached unparameterized.
+LITERAL_PREFIX = "__lit"
+
+def parameterize_query(query):
+    """
+    Returns (template, {var_name: Literal}) with every plain string literal
+    (no language tag / datatype) replaced by a variable.
+    """
+    bindings = {}
+    parts = []
+    last = 0
+    for m in _TOKEN.finditer(query):
+        if m.lastgroup != "string":
+            continue
+        suffix = query[m.end():m.end() + 2]
+        if suffix[:1] == "@" or suffix == "^^":
+            continue
+        text = m.group()
+        quote = 3 if text[:3] in ('"""', "'''") else 1
+        name = f"{LITERAL_PREFIX}{len(bindings)}"
+        bindings[name] = Literal(_unescape(text[quote:-quote]))
+        parts.append(query[last:m.start()])
+        parts.append("?" + name)
+        last = m.end()
+    parts.append(query[last:])
+    return "".join(parts), bindings
+
+_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+def _unescape(body):
+    return re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group()), body)
+
+def _cache_key(text):
+    # Literals are already lifted out, so collapsing whitespace is safe.
+    return " ".join(text.split())
+
+
+class QueryPlanCache:
+    """
+    LRU of prepared (parsed + translated) queries keyed on the literal-free
+    template.
+
+    Usage:
+        prepared, bindings = plans.prepare(query)
+        results = graph.query(prepared, initBindings=bindings)
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (prepared, parameterized)
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def prepare(self, query):
+        """(prepared query, initBindings). Raises on invalid SPARQL."""
+        # The SPARQL parser (pyparsing grammar, ~150 ms) loads on first use
+        from rdflib.plugins.sparql import prepareQuery
+        template, bindings = parameterize_query(query)
+        key = _cache_key(template)
+        entry = self._lookup(key)
+        if entry is None:
+            try:
+                entry = (prepareQuery(template), True)
+            except Exception:
+                entry = (None, False)  # literals cannot be lifted here
+            self._store(key, entry)
+        if entry[1]:
+            return entry[0], bindings
+
+        # Unparameterizable template: cache the exact query instead
+        key = ("exact", _cache_key(query))
+        entry = self._lookup(key)
+        if entry is None:
+            entry = (prepareQuery(query), False)
+            self._store(key, entry)
+        return entry[0], {}
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+if __name__ == "__main__":
+    q1 = """PREFIX : <http://math.bot/ontology/>
+            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+            SELECT ?label WHERE { ?c a :Concept ; rdfs:label ?label . FILTER(regex(?label, "미분", "i")) }"""
+    q2 = """select ?name where {
+              ?x a <http://math.bot/ontology/Concept> ;   # concepts only
+                 <http://www.w3.org/2000/01/rdf-schema#label> ?name .
+              filter(REGEX(?name, "미분", "i"))
+            }"""
+    c1, m1 = canonicalize_query(q1)
+    c2, m2 = canonicalize_query(q2)
+    print(c1)
+    print("same key:", c1 == c2, m1, m2)
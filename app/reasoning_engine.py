@@ -1,30 +1,88 @@
-import google.generativeai as genai
 import os
-from dotenv import load_dotenv
-import rdflib
 import json
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from model_router import ModelRouter, GeminiBackend, CircuitBreaker, CallTimeout, CircuitOpen, POLICY_FASTEST, POLICY_PREFERRED
+from query_cache import QueryResultCache, QueryPlanCache, LITERAL_PREFIX
+from answer_cache import create_answer_cache, answer_key, prompt_version, OUT_OF_CURRICULUM
+from deadline import DeadlineExceeded, stage_timeout
 
 # Load API Key
+# Only .env is read at import time. google.generativeai is imported and
+# configured on the first model call (or by warm_up_models in the
+# background), so graph-only tools and app startup don't pay for it and a
+# missing key doesn't break the import.
 load_dotenv()
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY is not set in .env file.")
+_genai_lock = threading.Lock()
+_genai_configured = False
 
-genai.configure(api_key=GOOGLE_API_KEY)
+def api_key_configured():
+    return bool(os.getenv("GOOGLE_API_KEY"))
 
-# Initialize Gemini Model
-MODEL_NAME = "gemini-3-flash-preview"
-model = genai.GenerativeModel(MODEL_NAME, generation_config={"response_mime_type": "application/json"})
+def configure_genai():
+    """Sets the Gemini API key once. Raises ValueError if it is missing."""
+    global _genai_configured
+    with _genai_lock:
+        if _genai_configured:
+            return
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY is not set in .env file.")
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        _genai_configured = True
 
-def generate_sparql(question, schema_info):
-    prompt = f"""
-    You are an expert Math Ontology Engineer.
-    Your task is to convert a natural language question into a SPARQL query.
-    
-    ### Ontology Schema (TBox)
-    {schema_info}
-    
+# Initialize Gemini Models
+# MODEL_NAME is the strong model reserved for answer prose.
+# SPARQL generation is routed to the fastest healthy model in SPARQL_MODELS
+# (comma separated, see app/check_models.py for available names).
+MODEL_NAME = os.getenv("MODEL_NAME", "gemini-3-flash-preview")
+SPARQL_MODELS = [m.strip() for m in os.getenv("SPARQL_MODELS", f"gemini-2.5-flash-lite,gemini-2.5-flash,{MODEL_NAME}").split(",") if m.strip()]
+ANSWER_MODELS = [MODEL_NAME] + [m for m in SPARQL_MODELS if m != MODEL_NAME]
+
+GENERATION_CONFIG = {"response_mime_type": "application/json"}
+router = ModelRouter(
+    {name: GeminiBackend(name, GENERATION_CONFIG, setup=configure_genai) for name in dict.fromkeys(SPARQL_MODELS + ANSWER_MODELS)},
+    {
+        "sparql": {"policy": POLICY_FASTEST, "models": SPARQL_MODELS, "hedge": True},
+        "answer": {"policy": POLICY_PREFERRED, "models": ANSWER_MODELS, "hedge": True},
+    },
+    # Calls slower than the model's HEDGE_QUANTILE get a duplicate, for at
+    # most HEDGE_MAX_RATE of traffic (see model_router).
+    hedge_quantile=float(os.getenv("HEDGE_QUANTILE", "0.95")),
+    max_hedge_rate=float(os.getenv("HEDGE_MAX_RATE", "0.1")),
+    # After BREAKER_FAILURES failed calls in a row, stop calling the
+    # models for BREAKER_RESET seconds (then probe once) and answer locally.
+    breaker=CircuitBreaker(int(os.getenv("BREAKER_FAILURES", "5")), float(os.getenv("BREAKER_RESET", "30"))),
+)
+
+def warm_up_models():
+    """
+    Imports and configures the Gemini client on a background thread, so it
+    overlaps with graph loading. Returns the thread.
+    """
+    def warm():
+        try:
+            for backend in router.backends.values():
+                if hasattr(backend, "client"):
+                    backend.client()
+        except Exception as e:
+            print(f"[WARN] Model client warm-up failed: {e}")
+    thread = threading.Thread(target=warm, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def model_available():
+    """False while the model circuit is open (callers should answer locally)."""
+    return router.breaker.available()
+
+# Static SPARQL prompt prefix.
+# Everything here is identical across requests (for a given schema), so it is
+# sent once as a cached prefix and only the question travels per request.
+SPARQL_GUIDELINES = """
     ### Guidelines
     1. **Context**: The Ontology ONLY contains **High School Math** concepts.
     2. **Concept Mapping**:
@@ -44,19 +102,93 @@ def generate_sparql(question, schema_info):
     ### Example 1 (High School Query)
     Question: "합성함수 미분이 뭐야?"
     Response:
-    {{
-        "query": "PREFIX : <http://math.bot/ontology/> PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#> SELECT ?targetLabel ?targetSubject ?targetChapter WHERE {{ ?target a :Concept ; rdfs:label ?targetLabel . FILTER(regex(?targetLabel, '합성함수의 미분', 'i')) OPTIONAL {{ ?targetSection :hasConcept ?target . ?targetChapNode :hasSection ?targetSection . ?targetSubNode :hasChapter ?targetChapNode . ?targetSubNode rdfs:label ?targetSubject . ?targetChapNode rdfs:label ?targetChapter . }} }}",
+    {
+        "query": "PREFIX : <http://math.bot/ontology/> PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#> SELECT ?targetLabel ?targetSubject ?targetChapter WHERE { ?target a :Concept ; rdfs:label ?targetLabel . FILTER(regex(?targetLabel, '합성함수의 미분', 'i')) OPTIONAL { ?targetSection :hasConcept ?target . ?targetChapNode :hasSection ?targetSection . ?targetSubNode :hasChapter ?targetChapNode . ?targetSubNode rdfs:label ?targetSubject . ?targetChapNode rdfs:label ?targetChapter . } }",
         "explanation": "'합성함수의 미분'은 고교 과정에 있으므로 직접 검색합니다."
-    }}
+    }
     
     ### Example 2 (University Query - Mapping)
     Question: "테일러 급수가 너무 어려워."
     Response:
-    {{
-        "query": "PREFIX : <http://math.bot/ontology/> PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#> SELECT ?targetLabel ?targetSubject ?targetChapter WHERE {{ ?target a :Concept ; rdfs:label ?targetLabel . FILTER(regex(?targetLabel, '급수|합성함수의 미분|이계도함수', 'i')) OPTIONAL {{ ?targetSection :hasConcept ?target . ?targetChapNode :hasSection ?targetSection . ?targetSubNode :hasChapter ?targetChapNode . ?targetSubNode rdfs:label ?targetSubject . ?targetChapNode rdfs:label ?targetChapter . }} }}",
+    {
+        "query": "PREFIX : <http://math.bot/ontology/> PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#> SELECT ?targetLabel ?targetSubject ?targetChapter WHERE { ?target a :Concept ; rdfs:label ?targetLabel . FILTER(regex(?targetLabel, '급수|합성함수의 미분|이계도함수', 'i')) OPTIONAL { ?targetSection :hasConcept ?target . ?targetChapNode :hasSection ?targetSection . ?targetSubNode :hasChapter ?targetChapNode . ?targetSubNode rdfs:label ?targetSubject . ?targetChapNode rdfs:label ?targetChapter . } }",
         "explanation": "'테일러 급수'는 온톨로지에 없으므로, 이를 이해하기 위해 필요한 고교 과정인 '급수', '합성함수의 미분', '이계도함수'를 검색합니다."
-    }}
+    }
+"""
+
+# schema_info -> prefix, LRU: hot reloads retire old schemas
+SPARQL_PREFIX_CACHE_SIZE = 16
+_sparql_prefix_cache = OrderedDict()
+_sparql_prefix_lock = threading.Lock()
+
+def build_sparql_prefix(schema_info):
+    """
+    Returns the static SPARQL prompt prefix for the given schema.
+    Memoized so the cache key (prefix text) is stable per graph version.
+    """
+    with _sparql_prefix_lock:
+        prefix = _sparql_prefix_cache.get(schema_info)
+        if prefix is not None:
+            _sparql_prefix_cache.move_to_end(schema_info)
+            return prefix
+        prefix = f"""
+    You are an expert Math Ontology Engineer.
+    Your task is to convert a natural language question into a SPARQL query.
     
+    ### Ontology Schema (TBox)
+    {schema_info}
+    """ + SPARQL_GUIDELINES
+        _sparql_prefix_cache[schema_info] = prefix
+        while len(_sparql_prefix_cache) > SPARQL_PREFIX_CACHE_SIZE:
+            _sparql_prefix_cache.popitem(last=False)
+    return prefix
+
+def extract_mentions(question, extractor):
+    """
+    Local entity linking, before any LLM call: ontology labels mentioned in
+    the question, directly or through an alias (graph_loader.get_mention_extractor).
+    """
+    if extractor is None:
+        return []
+    return extractor.find(question)
+
+def format_mentions(mentions):
+    lines = []
+    for m in mentions:
+        via = f" (written as '{m.surface}')" if m.alias else ""
+        lines.append(f"    - {m.label}{via}")
+    return "\n".join(lines)
+
+def format_candidates(hits):
+    """ConceptIndex.search() hits -> prompt lines."""
+    return "\n".join(f"    - {label} ({score:.2f})" for _, label, score in hits)
+
+def generate_sparql(question, schema_info, history="", candidates=None, mentions=None, deadline=None):
+    """
+    `mentions` (extract_mentions) are exact label/alias matches in the
+    question; `candidates` are fuzzy retrieval hits (ConceptIndex.search).
+    Both give the model exact ontology labels for misspelled, synonymous or
+    informally phrased terms.
+    Raises DeadlineExceeded when `deadline` (see deadline.py) runs out and
+    CircuitOpen while the models are unavailable.
+    """
+    prefix = build_sparql_prefix(schema_info)
+    prompt = f"""
+    ### Conversation So Far
+    {history}
+    """ if history else ""
+    if mentions:
+        prompt += f"""
+    ### Ontology Labels Mentioned In The Question
+{format_mentions(mentions)}
+    """
+    if candidates:
+        prompt += f"""
+    ### Closest Ontology Labels (local fuzzy match, score 0-1)
+    Prefer these exact labels in the regex when they fit the question.
+{format_candidates(candidates)}
+    """
+    prompt += f"""
     ### User Question
     {question}
     
@@ -64,50 +196,72 @@ def generate_sparql(question, schema_info):
     """
     
     try:
-        response = model.generate_content(prompt)
-        text = response.text.replace("```json", "").replace("```", "").strip()
+        timeout = stage_timeout(deadline, "sparql")
+        text, used_model = router.generate("sparql", prompt, prefix=prefix, timeout=timeout)
+        print(f"[INFO] SPARQL generated by {used_model}")
+        text = text.replace("```json", "").replace("```", "").strip()
         result = json.loads(text)
         return result
+    except (DeadlineExceeded, CallTimeout) as e:
+        raise DeadlineExceeded(f"SPARQL generation: {e}") from e
+    except CircuitOpen:
+        raise
     except Exception as e:
         print(f"[ERROR] SPARQL Generation Failed: {e}")
         return {"query": "", "explanation": f"Error: {e}"}
 
-def execute_sparql(query, graph):
+# Results of canonicalized queries, per graph version (SPARQL_CACHE_MB budget)
+result_cache = QueryResultCache(max_bytes=int(os.getenv("SPARQL_CACHE_MB", "64")) << 20)
+# Parsed algebra of literal-free query templates (skips pyparsing on repeats)
+plan_cache = QueryPlanCache()
+
+# Runs queries that have a deadline. rdflib cannot interrupt a query, so an
+# abandoned one finishes here in the background (and still fills the cache).
+_query_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sparql")
+
+def execute_sparql(query, graph, cache=result_cache, deadline=None):
     """
     Executes the SPARQL query on the given graph.
+    Results are served from `cache` (None to bypass) when an equivalent
+    query already ran on the same graph.
+    Raises DeadlineExceeded when `deadline` runs out first.
     """
+    if cache is not None:
+        cached = cache.get(graph, query)
+        if cached is not None:
+            return cached
+    if deadline is None:
+        return _run_query(query, graph, cache)
+
+    future = _query_executor.submit(_run_query, query, graph, cache)
     try:
-        results = graph.query(query)
+        return future.result(timeout=stage_timeout(deadline, "execute"))
+    except FuturesTimeout:
+        raise DeadlineExceeded("SPARQL execution timed out")
+
+def _run_query(query, graph, cache):
+    try:
+        prepared, bindings = plan_cache.prepare(query)
+        results = graph.query(prepared, initBindings=bindings)
         data = []
+        out_vars = [var for var in results.vars if not str(var).startswith(LITERAL_PREFIX)]
         for row in results:
             item = {}
-            for var in results.vars:
+            for var in out_vars:
                 val = row[var]
                 item[str(var)] = str(val) if val is not None else None
             data.append(item)
-        return data
     except Exception as e:
         print(f"[ERROR] SPARQL Execution Failed: {e}")
         return []
+    if cache is not None:
+        cache.put(graph, query, data)
+    return data
 
-def generate_answer(question, raw_data, sparql_explanation):
-    """
-    Generates a structured JSON answer with 'answer' and 'evidence'.
-    Checks if the concept is out of curriculum based on sparql_explanation.
-    """
-    
-    data_summary = json.dumps(raw_data, ensure_ascii=False) if raw_data else "No data found."
-    
-    prompt = f"""
+# Static answer prompt prefix (persona, rules and output schema).
+ANSWER_INSTRUCTIONS = """
     You are a Math Mentor Chatbot.
     
-    ### User Question
-    {question}
-    
-    ### Retrieved Knowledge (SPARQL Results)
-    {data_summary}
-    (Logic: {sparql_explanation})
-    
     ### Instructions
     1. **Analyze**: Carefully evaluate the retrieved data (Concepts, Prerequisites, etc.) and the provided Logic string.
     
@@ -137,28 +291,120 @@ def generate_answer(question, raw_data, sparql_explanation):
        
     ### Output Format (JSON)
     Strictly adhere to this Typescript Interface:
-    interface Response {{
+    interface Response {
         answer: string; // Must start with "교육과정 외의 내용입니다." if applicable.
-        evidence: {{
+        evidence: {
             subject: string;
             chapter: string;
             concept: string;
             desc?: string; // e.g., "Prerequisite for this advanced topic"
-        }}[];
-    }}
+        }[];
+    }
+"""
+
+def local_rows(mentions, candidates):
+    """
+    Rows in the shape of a SPARQL result built from local retrieval
+    (extract_mentions / ConceptIndex.search), for when no query ran.
+    """
+    labels = [m.label for m in mentions or []] + [label for _, label, _ in candidates or []]
+    return [{"targetLabel": label} for label in dict.fromkeys(labels)]
+
+def _row_field(row, name):
+    for key, value in row.items():
+        if name in key.lower() and value:
+            return value
+    return None
+
+def templated_answer(raw_data, sparql_explanation=""):
+    """
+    {answer, evidence} rendered from the retrieved rows without a model call,
+    used when the answer stage has no time left.
+    """
+    evidence = []
+    seen = set()
+    for row in raw_data or []:
+        concept = _row_field(row, "label") or next((v for v in row.values() if v), None)
+        if not concept or concept in seen:
+            continue
+        seen.add(concept)
+        evidence.append({
+            "subject": _row_field(row, "subject") or "Unknown",
+            "chapter": _row_field(row, "chapter") or "Unknown",
+            "concept": concept,
+            "desc": "검색된 관련 개념",
+        })
+
+    if not evidence:
+        return {
+            "answer": "지금은 답변을 준비하는 데 시간이 오래 걸리고 있어요. 잠시 후 다시 질문해 주세요.",
+            "evidence": [],
+        }
+    listed = ", ".join(
+        e["concept"] if e["subject"] == "Unknown" else f"{e['concept']} ({e['subject']} > {e['chapter']})"
+        for e in evidence[:5]
+    )
+    answer = f"답변 생성이 지연되어 관련 개념을 먼저 정리해 드릴게요: {listed}. 아래 근거 개념부터 복습해 보세요."
+    if OUT_OF_CURRICULUM in (sparql_explanation or ""):
+        answer = "교육과정 외의 내용입니다. " + answer
+    return {"answer": answer, "evidence": evidence}
+
+# Generated answers, keyed on (question, rows, flags, history, ANSWER_VERSION)
+answer_cache = create_answer_cache()
+ANSWER_VERSION = prompt_version(",".join(ANSWER_MODELS), ANSWER_INSTRUCTIONS)
+
+def generate_answer(question, raw_data, sparql_explanation, history="", cache=answer_cache, deadline=None):
+    """
+    Generates a structured JSON answer with 'answer' and 'evidence'.
+    Checks if the concept is out of curriculum based on sparql_explanation.
+    `history` is the compacted multi-turn context (see session_store).
+    Answers are served from `cache` (None to bypass) when the same question
+    already retrieved the same rows. When `deadline` runs out the rows are
+    rendered with templated_answer instead. Raises CircuitOpen while the
+    models are unavailable (see local_answer).
+    """
+    if cache is not None:
+        key = answer_key(question, raw_data, sparql_explanation, history, ANSWER_VERSION)
+        cached = cache.get(key)
+        if cached is not None:
+            print("[INFO] Answer served from cache")
+            return cached
+    
+    data_summary = json.dumps(raw_data, ensure_ascii=False) if raw_data else "No data found."
+    
+    prompt = f"""
+    ### Conversation So Far
+    {history}
+    """ if history else ""
+    prompt += f"""
+    ### User Question
+    {question}
+    
+    ### Retrieved Knowledge (SPARQL Results)
+    {data_summary}
+    (Logic: {sparql_explanation})
     """
     
     try:
-        response = model.generate_content(prompt)
-        text = response.text.replace("```json", "").replace("```", "").strip()
+        timeout = stage_timeout(deadline, "answer")
+        text, used_model = router.generate("answer", prompt, prefix=ANSWER_INSTRUCTIONS, timeout=timeout)
+        print(f"[INFO] Answer generated by {used_model}")
+        text = text.replace("```json", "").replace("```", "").strip()
         result = json.loads(text)
-        return result
+    except (DeadlineExceeded, CallTimeout) as e:
+        print(f"[WARN] Answer deadline reached ({e}), using templated answer")
+        return templated_answer(raw_data, sparql_explanation)
+    except CircuitOpen:
+        raise
     except Exception as e:
         print(f"[ERROR] Answer Generation Failed: {e}")
         return {
             "answer": f"답변 생성 중 오류가 발생했습니다. ({e})",
             "evidence": []
         }
+    if cache is not None:
+        cache.put(key, result)
+    return result
 
 if __name__ == "__main__":
     # Test Block
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESSION_DIR = os.path.join(PROJECT_ROOT, "data/sessions")
+
+# Per-session caps. Older turns beyond these are folded into `summary`,
+# so the prompt context stays constant-size however long a session runs.
+MAX_RECENT_TURNS = 6
+MAX_RECENT_CHARS = 2000
+MAX_SUMMARY_CHARS = 600
+
+
+def summarize_turns(summary, turns, max_chars=MAX_SUMMARY_CHARS):
+    """
+    Default (local, zero-cost) rolling summarizer.
+    Keeps one short line per folded turn and drops the oldest lines once
+    the summary exceeds `max_chars`. Can be swapped for an LLM summarizer.
+    """
+    lines = [l for l in summary.split("\n") if l] if summary else []
+    for turn in turns:
+        text = " ".join(turn["content"].split())
+        if len(text) > 80:
+            text = text[:80] + "…"
+        lines.append(f"{turn['role']}: {text}")
+
+    while lines and len("\n".join(lines)) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class Session:
+    def __init__(self, session_id, turns=None, summary="", updated_at=None):
+        self.id = session_id
+        self.turns = turns or []
+        self.summary = summary
+        self.updated_at = updated_at or time.time()
+
+    def to_dict(self):
+        return {"id": self.id, "turns": self.turns, "summary": self.summary, "updated_at": self.updated_at}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data.get("turns"), data.get("summary", ""), data.get("updated_at"))
+
+
+class SessionStore(ABC):
+    """
+    Base class for multi-turn session storage.
+    Subclasses implement `_load`, `_save`, `_delete` and `_evict`.
+
+    Args:
+        ttl (float): seconds of inactivity before a session expires.
+        max_sessions (int): LRU cap on live sessions.
+        summarizer (callable): (summary, turns) -> new summary.
+    """
+
+    def __init__(self, ttl=3600, max_sessions=1000, summarizer=summarize_turns,
+                 max_turns=MAX_RECENT_TURNS, max_chars=MAX_RECENT_CHARS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.summarizer = summarizer
+        self.max_turns = max_turns
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Returns the live session for `session_id`, or a fresh one."""
+        with self._lock:
+            session = self._load(session_id)
+            if session and time.time() - session.updated_at > self.ttl:
+                self._delete(session_id)
+                session = None
+            return session or Session(session_id)
+
+    def append(self, session_id, role, content):
+        """Adds a turn, compacts older turns into the summary and persists."""
+        with self._lock:
+            session = self._load(session_id)
+            if not session or time.time() - session.updated_at > self.ttl:
+                session = Session(session_id)
+
+            session.turns.append({"role": role, "content": content})
+            self._compact(session)
+            session.updated_at = time.time()
+            self._save(session)
+            self._evict()
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            self._delete(session_id)
+
+    def _compact(self, session):
+        folded = []
+        while session.turns and (
+            len(session.turns) > self.max_turns
+            or sum(len(t["content"]) for t in session.turns) > self.max_chars
+        ):
+            folded.append(session.turns.pop(0))
+        if folded:
+            session.summary = self.summarizer(session.summary, folded)
+
+    @abstractmethod
+    def _load(self, session_id):
+        ...
+
+    @abstractmethod
+    def _save(self, session):
+        ...
+
+    @abstractmethod
+    def _delete(self, session_id):
+        ...
+
+    @abstractmethod
+    def _evict(self):
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """In-process store (OrderedDict as LRU)."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._sessions = OrderedDict()
+
+    def _load(self, session_id):
+        session = self._sessions.get(session_id)
+        if session:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _save(self, session):
+        self._sessions[session.id] = session
+        self._sessions.move_to_end(session.id)
+
+    def _delete(self, session_id):
+        self._sessions.pop(session_id, None)
+
+    def _evict(self):
+        now = time.time()
+        for sid in [sid for sid, s in self._sessions.items() if now - s.updated_at > self.ttl]:
+            del self._sessions[sid]
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+class DiskSessionStore(SessionStore):
+    """
+    On-disk store: one JSON file per session. File mtime doubles as the
+    LRU clock, so sessions survive restarts and can be shared by workers.
+    """
+
+    def __init__(self, directory=SESSION_DIR, evict_interval=60, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory  # created on the first save
+        self.evict_interval = evict_interval
+        self._last_evict = 0.0
+
+    def _path(self, session_id):
+        # Ids come from clients; hashing keeps distinct ids in distinct files.
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _load(self, session_id):
+        path = self._path(session_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                session = Session.from_dict(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)
+        return session
+
+    def _save(self, session):
+        path = self._path(session.id)
+        tmp_path = path + ".tmp"
+        os.makedirs(self.directory, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(session.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _delete(self, session_id):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        # Directory scans are O(sessions); run them at most every evict_interval.
+        now = time.time()
+        if now - self._last_evict < self.evict_interval:
+            return
+        self._last_evict = now
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+                if now - mtime > self.ttl:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue  # removed by another worker sharing the directory
+            entries.append((mtime, path))
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_sessions)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def create_session_store(kind=None, **kwargs):
+    """
+    Builds the configured store. `kind` defaults to $SESSION_STORE
+    ("memory" or "disk"); the disk directory comes from $SESSION_DIR.
+    """
+    kind = kind or os.getenv("SESSION_STORE", "memory")
+    if kind == "disk":
+        return DiskSessionStore(directory=os.getenv("SESSION_DIR", SESSION_DIR), **kwargs)
+    return InMemorySessionStore(**kwargs)
+
+
+def format_history(session):
+    """
+    Renders a session as a compact prompt block (summary + recent turns).
+    Returns "" for a new session so single-turn prompts are unchanged.
+    """
+    if not session.summary and not session.turns:
+        return ""
+    parts = []
+    if session.summary:
+        parts.append(f"(Earlier, summarized)\n{session.summary}")
+    for turn in session.turns:
+        parts.append(f"{turn['role']}: {turn['content']}")
+    return "\n".join(parts)
@@ -0,0 +1,277 @@
+import os
+import re
+import time
+import threading
+
+from changeset import changes_path
+from graph_loader import load_graph, generate_schema_info, get_mention_extractor
+from materialize import load_inferred
+from concept_index import ConceptIndex
+from mention_extractor import ALIASES_FILE
+
+# Project-relative data locations (override with env vars)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TBOX_PATH = os.getenv("TBOX_PATH", os.path.join(PROJECT_ROOT, "data/ontology/math_tbox.ttl"))
+DATA_PATH = os.getenv("DATA_PATH", os.path.join(PROJECT_ROOT, "data/knowledge_graph/math_abox.ttl"))
+TENANTS_DIR = os.getenv("TENANTS_DIR", os.path.join(PROJECT_ROOT, "data/tenants"))
+
+DEFAULT_TENANT = "default"
+TENANT_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# rdflib's in-memory store costs roughly 1-2 KB per triple (indexes included).
+BYTES_PER_TRIPLE = int(os.getenv("GRAPH_BYTES_PER_TRIPLE", "1500"))
+
+# Seconds between checks of loaded tenants' source files (0 = no hot reload).
+RELOAD_INTERVAL = float(os.getenv("GRAPH_RELOAD_INTERVAL", "5"))
+
+# Tenants
+# A tenant (school / curriculum) key selects which ABox to answer from:
+#   "default"   -> DATA_PATH + TBOX_PATH
+#   "<key>"     -> TENANTS_DIR/<key>/math_abox.ttl (+ its own math_tbox.ttl,
+#                  falling back to the shared TBOX_PATH)
+# Graphs are loaded on first use and kept under a memory budget with LRU
+# eviction; pinned tenants are loaded eagerly and never evicted. Edits to a
+# loaded tenant's ABox (or its changeset log) / TBox are picked up by the
+# watcher and swapped in without a restart.
+
+
+class UnknownTenantError(KeyError):
+    """Raised for tenant keys that are malformed or have no ABox on disk."""
+
+
+def source_signature(paths):
+    """(mtime, size) of each source file; None for missing ones."""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class TenantGraph:
+    """
+    Immutable snapshot of everything /chat needs for one tenant.
+    `full_graph` (ABox + TBox) is what the map shows; `query_graph` adds the
+    materialized inferences for SPARQL; `concept_index` is the fuzzy label
+    index and `mention_extractor` the exact label/alias matcher. `node_table`
+    (the map's lookup table) is set by the registry's on_load hook, so it lives
+    and dies with the snapshot. `sources` / `signature` record the files it was
+    built from, for hot reload.
+    """
+
+    def __init__(self, key, full_graph, schema_info, query_graph=None, sources=(),
+                 concept_index=None, mention_extractor=None):
+        self.key = key
+        self.sources = list(sources)
+        self.signature = source_signature(self.sources)
+        self.last_used = time.monotonic()
+        self.full_graph = full_graph
+        self.schema_info = schema_info
+        self.query_graph = query_graph if query_graph is not None else full_graph
+        self.concept_index = concept_index
+        self.mention_extractor = mention_extractor
+        self.node_table = None
+        size = len(full_graph) + (len(self.query_graph) if self.query_graph is not full_graph else 0)
+        self.size = size * BYTES_PER_TRIPLE
+
+
+def tenant_paths(key):
+    """(abox_path, tbox_path) for a tenant key."""
+    if not TENANT_KEY_PATTERN.match(key or ""):
+        raise UnknownTenantError(key)
+    if key == DEFAULT_TENANT:
+        return DATA_PATH, TBOX_PATH
+    tenant_dir = os.path.join(TENANTS_DIR, key)
+    abox = os.path.join(tenant_dir, "math_abox.ttl")
+    if not os.path.exists(abox):
+        raise UnknownTenantError(key)
+    tbox = os.path.join(tenant_dir, "math_tbox.ttl")
+    return abox, tbox if os.path.exists(tbox) else TBOX_PATH
+
+
+def load_tenant(key):
+    abox_path, tbox_path = tenant_paths(key)
+    sources = [abox_path, changes_path(abox_path), tbox_path, ALIASES_FILE]
+    signature = source_signature(sources)  # taken first: edits during the load trigger another reload
+    print(f"[INFO] Loading graph for tenant '{key}'...")
+    g = load_graph(abox_path)
+    tbox = load_graph(tbox_path)
+    if g is None or tbox is None:
+        raise RuntimeError(f"Failed to load graph for tenant '{key}'")
+    full_graph = g + tbox
+    query_graph = full_graph + load_inferred(abox_path, tbox_path, g, tbox)
+    tenant = TenantGraph(key, full_graph, generate_schema_info(full_graph), query_graph, sources,
+                         ConceptIndex(full_graph), get_mention_extractor(g))
+    tenant.signature = signature
+    return tenant
+
+
+class TenantRegistry:
+    """
+    Lazily loaded tenant graphs under a memory budget, with hot reload.
+
+    - get(key) loads on first use; concurrent first requests for the same
+      tenant share one load.
+    - When the estimated total exceeds `memory_budget` bytes, least recently
+      used unpinned tenants are dropped (the tenant being served never is).
+    - `pinned` tenants are loaded by warm() and never evicted.
+    - reload_changed() (or the start_watcher() thread) rebuilds tenants whose
+      source files changed and swaps the new snapshot in.
+
+    Snapshots are published RCU-style: `_tenants` is never mutated, writers
+    replace it with an updated copy under `_lock`, and readers just read the
+    current dict without locking. A request holds on to the TenantGraph it
+    got, so in-flight requests finish on the old version after a swap.
+    """
+
+    def __init__(self, loader=load_tenant, memory_budget=1 << 30, pinned=(),
+                 on_evict=None, on_load=None):
+        self.loader = loader
+        self.memory_budget = memory_budget
+        self.pinned = set(pinned)
+        self.on_evict = on_evict
+        self.on_load = on_load
+        self._tenants = {}
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> Lock held while that tenant loads
+        self._failed = {}   # key -> signature whose reload failed (retried once it changes)
+        self._watcher = None
+
+    def warm(self):
+        for key in sorted(self.pinned):
+            self.get(key)
+
+    def get(self, key):
+        tenant = self._tenants.get(key)
+        if tenant is not None:
+            tenant.last_used = time.monotonic()
+            return tenant
+
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        with load_lock:
+            tenant = self._tenants.get(key)
+            if tenant is not None:
+                return tenant
+            try:
+                tenant = self._load(key)
+            except Exception:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            with self._lock:
+                self._publish(key, tenant)
+                self._loading.pop(key, None)
+                self._evict(keep=key)
+            return tenant
+
+    def _load(self, key):
+        tenant = self.loader(key)
+        if self.on_load:
+            self.on_load(tenant)  # e.g. build indexes before the snapshot is visible
+        return tenant
+
+    def _publish(self, key, tenant):
+        tenants = dict(self._tenants)
+        tenants[key] = tenant
+        self._tenants = tenants
+
+    def _evict(self, keep):
+        total = sum(t.size for t in self._tenants.values())
+        if total <= self.memory_budget:
+            return
+        tenants = dict(self._tenants)
+        for key, tenant in sorted(tenants.items(), key=lambda kv: kv[1].last_used):
+            if total <= self.memory_budget:
+                break
+            if key == keep or key in self.pinned:
+                continue
+            del tenants[key]
+            total -= tenant.size
+            print(f"[INFO] Evicted tenant '{key}' ({tenant.size >> 20} MB est.)")
+            if self.on_evict:
+                self.on_evict(tenant)
+        self._tenants = tenants
+
+    def reload_changed(self):
+        """
+        Rebuilds every loaded tenant whose sources changed since it was loaded
+        and swaps it in. Returns the reloaded keys. A failed rebuild keeps
+        serving the old snapshot.
+        """
+        reloaded = []
+        for key, old in list(self._tenants.items()):
+            signature = source_signature(old.sources)
+            if signature == old.signature or self._failed.get(key) == signature:
+                continue
+            start = time.perf_counter()
+            try:
+                new = self._load(key)
+            except Exception as e:
+                self._failed[key] = signature
+                print(f"[ERROR] Reload of tenant '{key}' failed; keeping the current snapshot: {e}")
+                continue
+            with self._lock:
+                if self._tenants.get(key) is not old:
+                    continue  # evicted or swapped meanwhile
+                new.last_used = old.last_used
+                self._publish(key, new)
+                self._failed.pop(key, None)
+            if self.on_evict:
+                self.on_evict(old)
+            reloaded.append(key)
+            print(f"[INFO] Reloaded tenant '{key}' in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return reloaded
+
+    def start_watcher(self, interval=RELOAD_INTERVAL):
+        """Polls the loaded tenants' sources every `interval` seconds (daemon thread)."""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload_changed()
+                except Exception as e:
+                    print(f"[ERROR] Graph watcher: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="graph-watcher", daemon=True)
+        self._watcher.start()
+
+    def stats(self):
+        tenants = self._tenants
+        return {
+            "loaded": sorted(tenants, key=lambda k: tenants[k].last_used),
+            "pinned": sorted(self.pinned),
+            "estimated_bytes": sum(t.size for t in tenants.values()),
+            "memory_budget": self.memory_budget,
+        }
+
+
+def create_tenant_registry(**kwargs):
+    """Registry configured from GRAPH_MEMORY_MB and PINNED_TENANTS (comma-separated)."""
+    pinned = os.getenv("PINNED_TENANTS", DEFAULT_TENANT)
+    budget_mb = int(os.getenv("GRAPH_MEMORY_MB", "1024"))
+    return TenantRegistry(memory_budget=budget_mb << 20,
+                          pinned=[p.strip() for p in pinned.split(",") if p.strip()],
+                          **kwargs)
+
+
+if __name__ == "__main__":
+    # Eviction demo with fake tenants (no files needed)
+    class FakeGraph(list):
+        pass
+
+    def fake_loader(key):
+        return TenantGraph(key, FakeGraph(range(1000)), "")
+
+    registry = TenantRegistry(fake_loader, memory_budget=3 * 1000 * BYTES_PER_TRIPLE, pinned=["a"])
+    registry.warm()
+    for key in ["b", "c", "b", "d", "e"]:
+        time.sleep(0.001)
+        registry.get(key)
+    print(registry.stats())  # a (pinned) + the two most recently used
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import statistics
+
+# Run from the project root:  python benchmarks/bench_hedging.py [calls]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "app"))
+
+from model_router import ModelRouter, StubBackend, POLICY_PREFERRED
+
+# Heavy-tailed stub: 3% of calls take 8x the median, like the slow Gemini
+# calls that dominate our p99.
+LATENCY = (0.02, 0.005)
+TAIL = (0.03, 8.0)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(hedge, calls, max_hedge_rate):
+    backend = StubBackend("stub", latency=LATENCY, tail=TAIL, response="ok")
+    router = ModelRouter({"stub": backend},
+                         {"answer": {"policy": POLICY_PREFERRED, "models": ["stub"], "hedge": hedge}},
+                         max_hedge_rate=max_hedge_rate)
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        text, _ = router.generate("answer", "q")
+        assert text == "ok"
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, router.report()
+
+
+def main(calls=400, max_hedge_rate=0.1):
+    print(f"\n{'mode':<10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'hedges':>7}  (ms, {calls} calls)")
+    for hedge in (False, True):
+        samples, report = run(hedge, calls, max_hedge_rate)
+        hedges = report["stub"]["hedges"]
+        print(f"{'hedged' if hedge else 'plain':<10} {statistics.median(samples):8.1f} "
+              f"{percentile(samples, 0.95):8.1f} {percentile(samples, 0.99):8.1f} {max(samples):8.1f} "
+              f"{hedges:7d}")
+        if hedge:
+            rate = hedges / calls
+            print(f"[INFO] hedge rate {rate:.3f} (cap {max_hedge_rate}), wins {report['stub']['hedge_wins']}, "
+                  f"denied {report['hedge_budget']['denied']}")
+            assert rate <= max_hedge_rate + 5.0 / calls, "hedge budget exceeded"
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 400)
@@ -0,0 +1,68 @@
+import os
+import re
+import sys
+import statistics
+import subprocess
+
+# Run from the project root:  python benchmarks/bench_import.py [repeats]
+# Import-time profile of the app modules that every cold start pays for
+# (python -X importtime in a fresh interpreter, no API key set). Exits 1 if
+# a module goes over its budget or pulls in a module that must stay lazy,
+# so startup regressions show up before deploy.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "app")
+
+# module -> cumulative import budget (ms)
+BUDGETS = {
+    "main": 900,
+    "reasoning_engine": 400,
+    "graph_loader": 300,
+    "tenant_graphs": 500,
+}
+# Must only be imported on first use
+LAZY_MODULES = ("google.generativeai", "scipy", "pyvis")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile(module):
+    """{imported module: (self us, cumulative us, depth)} for `import module`."""
+    env = {k: v for k, v in os.environ.items() if k != "GOOGLE_API_KEY"}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=APP_DIR, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    timings = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            timings[m.group(4)] = (int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2)
+    return timings
+
+
+def main(repeats=3):
+    failed = False
+    print(f"\n{'module':<20} {'import':>9} {'budget':>8}  heaviest dependencies (cumulative ms)")
+    for module, budget in BUDGETS.items():
+        runs = [profile(module) for _ in range(repeats)]
+        total = statistics.median(r[module][1] for r in runs) / 1000
+        last = runs[-1]
+        heavy = sorted(((cum, name) for name, (_, cum, depth) in last.items() if depth == 1), reverse=True)[:3]
+        print(f"{module:<20} {total:8.1f}ms {budget:6d}ms  "
+              + ", ".join(f"{name} {cum / 1000:.0f}" for cum, name in heavy))
+
+        if total > budget:
+            print(f"[ERROR] {module}: import takes {total:.0f} ms (budget {budget} ms)")
+            failed = True
+        for lazy in LAZY_MODULES:
+            if lazy in last:
+                print(f"[ERROR] {module}: imports {lazy} at import time")
+                failed = True
+
+    if failed:
+        sys.exit(1)
+    print("[SUCCESS] Import times within budget")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import statistics
+
+# Run from the project root:  python benchmarks/bench_sparql.py [repeats]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "app"))
+
+from rdflib.plugins.sparql import prepareQuery
+from graph_loader import load_graph
+from query_cache import QueryPlanCache, LITERAL_PREFIX
+
+DATA_PATH = os.path.join(ROOT, "data/knowledge_graph/math_abox.ttl")
+TBOX_PATH = os.path.join(ROOT, "data/ontology/math_tbox.ttl")
+
+# The shape generate_sparql produces (see SPARQL_GUIDELINES), with the regex
+# term varying per question.
+TEMPLATE = (
+    "PREFIX : <http://math.bot/ontology/> PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#> "
+    "SELECT ?targetLabel ?targetSubject ?targetChapter WHERE {{ ?target a :Concept ; rdfs:label ?targetLabel . "
+    "FILTER(regex(?targetLabel, '{term}', 'i')) OPTIONAL {{ ?targetSection :hasConcept ?target . "
+    "?targetChapNode :hasSection ?targetSection . ?targetSubNode :hasChapter ?targetChapNode . "
+    "?targetSubNode rdfs:label ?targetSubject . ?targetChapNode rdfs:label ?targetChapter . }} }}"
+)
+TERMS = ["합성함수의 미분", "급수|합성함수의 미분|이계도함수", "평균값 정리", "삼각함수", "확률|통계",
+         "벡터의 내적", "정적분", "이차방정식", "수열의 극한", "로그함수"]
+
+
+def rows(results):
+    out_vars = [v for v in results.vars if not str(v).startswith(LITERAL_PREFIX)]
+    return sorted(tuple(str(r[v]) for v in out_vars) for r in results)
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(repeats=5):
+    g = load_graph(DATA_PATH) + load_graph(TBOX_PATH)
+    queries = [TEMPLATE.format(term=t) for t in TERMS]
+    plans = QueryPlanCache()
+    plans.prepare(queries[0])  # warm: the template is parsed once
+
+    print(f"\n{'query':<32} {'parse':>9} {'cold':>9} {'cached':>9}  (median ms, {repeats} runs)")
+    totals = [0.0, 0.0, 0.0]
+    for term, q in zip(TERMS, queries):
+        parse = timed(lambda: prepareQuery(q), repeats)
+        cold = timed(lambda: list(g.query(q)), repeats)
+
+        def cached():
+            prepared, bindings = plans.prepare(q)
+            return list(g.query(prepared, initBindings=bindings))
+        warm = timed(cached, repeats)
+
+        prepared, bindings = plans.prepare(q)
+        assert rows(g.query(q)) == rows(g.query(prepared, initBindings=bindings)), term
+        totals = [a + b for a, b in zip(totals, (parse, cold, warm))]
+        print(f"{term:<32} {parse:9.2f} {cold:9.2f} {warm:9.2f}")
+
+    print(f"{'total':<32} {totals[0]:9.2f} {totals[1]:9.2f} {totals[2]:9.2f}")
+    print(f"[INFO] Plan cache: {plans.stats()} ; speed-up {totals[1] / totals[2]:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import rdflib
+from rdflib import Namespace, RDFS
+
+from app.changeset import changes_path, format_changeset, apply_changes, fold_into_snapshot
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+from materialize import build_inferred, inferred_path
+from ontology_store import OntologyStore
+import import_hierarchy_report
+import enrich_ontology
+import connect_prerequisites
+import import_proposed_additions
+import export_ontology_report
+
+# Configuration
+ABOX_FILE = "data/knowledge_graph/math_abox.ttl"
+TBOX_FILE = "data/ontology/math_tbox.ttl"
+BUILD_DIR = "data/build"
+STATE_FILE = os.path.join(BUILD_DIR, "state.json")
+MANUAL_CHANGES = "data/knowledge_graph/math_abox.manual.nt"
+
+# Namespaces
+NS = Namespace("http://math.bot/ontology/")
+OWL = Namespace("http://www.w3.org/2002/07/owl#")
+XSD = Namespace("http://www.w3.org/2001/XMLSchema#")
+
+# Incremental ABox build
+# Replaces running the ETL scripts by hand, in order, each one re-parsing
+# and re-serializing the whole ABox:
+#
+#   hierarchy -> enrich -> prerequisites -> additions -> [abox] -> inferred, reports
+#
+# Each graph stage declares its input files. Its key is the hash of those
+# files chained with the previous stage's key. A stage's effect on the graph
+# is cached in data/build/<stage>.changes.nt (same format as the ABox
+# changeset log). A stage whose key is unchanged is not re-run: its cached
+# delta is replayed instead, and only if a later stage actually needs the
+# graph. When nothing changed the build reads nothing but the input files.
+#
+# Edits appended to the ABox changeset log outside the build (standalone ETL
+# runs, hand fixes) are not produced by any stage. The abox stage folds them
+# into the snapshot and moves them to MANUAL_CHANGES, which is replayed after
+# the graph stages on every rebuild, so they survive later regenerations.
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Stage:
+    """
+    A build step. `run(store)` mutates the shared OntologyStore (or, for the
+    first stage, returns a new one); `inputs` are the files it depends on,
+    including its own source so code edits re-run it.
+    """
+
+    def __init__(self, name, inputs, run):
+        self.name = name
+        self.inputs = inputs
+        self.run = run
+
+    def key(self, upstream):
+        h = hashlib.sha256(upstream.encode("utf-8"))
+        for path in self.inputs:
+            h.update(path.encode("utf-8"))
+            h.update(file_hash(path).encode("ascii"))
+        return h.hexdigest()
+
+    def delta_path(self):
+        return os.path.join(BUILD_DIR, f"{self.name}.changes.nt")
+
+
+def _new_store(g):
+    for prefix, namespace in (("", NS), ("owl", OWL), ("rdfs", RDFS), ("xsd", XSD)):
+        g.bind(prefix, namespace)
+    return OntologyStore(ABOX_FILE, on_duplicate="skip", graph=g)
+
+def _hierarchy(store):
+    g = import_hierarchy_report.build_hierarchy()
+    new_store = _new_store(g)
+    new_store.added = list(g)  # the whole graph is this stage's delta
+    return new_store
+
+
+GRAPH_STAGES = [
+    # Every stage edits the graph through ontology_store.py and its delta is
+    # written by app/changeset.py; both feed the key chain from here.
+    Stage("hierarchy",
+          [import_hierarchy_report.INPUT_FILE, "import_hierarchy_report.py", "stable_ids.py",
+           "ontology_store.py", "app/changeset.py"],
+          _hierarchy),
+    Stage("enrich",
+          [enrich_ontology.INPUT_PROP_FILE, "enrich_ontology.py"],
+          enrich_ontology.enrich_ontology),
+    Stage("prerequisites",
+          ["connect_prerequisites.py"],
+          connect_prerequisites.connect_prerequisites),
+    Stage("additions",
+          [import_proposed_additions.INPUT_FILE, "import_proposed_additions.py"],
+          import_proposed_additions.import_additions),
+]
+
+REPORT_OUTPUTS = [export_ontology_report.HIERARCHY_FILE, export_ontology_report.PREREQ_FILE]
+REPORT_INPUTS = ["export_ontology_report.py"]
+
+
+def abox_key(graph_key):
+    """Snapshot key: the graph stages' key chained with MANUAL_CHANGES (if any)."""
+    inputs = [MANUAL_CHANGES] if os.path.exists(MANUAL_CHANGES) else []
+    return Stage("abox", inputs, None).key(graph_key)
+
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_state(state):
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, STATE_FILE)
+
+def outputs_intact(record, paths):
+    """True if every output exists and still has the hash recorded at build time."""
+    hashes = record.get("outputs", {})
+    return all(os.path.exists(p) and hashes.get(p) == file_hash(p) for p in paths)
+
+
+def build(force=False):
+    """
+    Runs the pipeline, skipping up-to-date stages. Returns the names of the
+    stages that were (re)built.
+    """
+    start = time.perf_counter()
+    state = {} if force else load_state()
+    os.makedirs(BUILD_DIR, exist_ok=True)
+
+    built = []
+    store = None
+    pending = []  # cached deltas of skipped stages not yet applied to `store`
+
+    def build_abox_graph():
+        nonlocal store
+        if store is None:
+            store = _new_store(rdflib.Graph())
+        for path in pending:
+            apply_changes(store.graph, path)
+        if pending:
+            store.reindex()
+        pending.clear()
+        return store
+
+    # --- 1. Graph stages ---
+    key = ""
+    for stage in GRAPH_STAGES:
+        key = stage.key(key)
+        record = state.get(stage.name, {})
+        if record.get("key") == key and os.path.exists(stage.delta_path()):
+            print(f"[SKIP] {stage.name}: up to date")
+            pending.append(stage.delta_path())
+            continue
+
+        t0 = time.perf_counter()
+        print(f"[BUILD] {stage.name}")
+        result = stage.run(build_abox_graph())
+        if result is not None:
+            store = result
+        with open(stage.delta_path(), "w", encoding="utf-8") as f:
+            f.write(format_changeset(store.added, store.removed, stage.name))
+        store.added, store.removed = [], []
+        state[stage.name] = {"key": key}
+        built.append(stage.name)
+        print(f"[BUILD] {stage.name}: {(time.perf_counter() - t0) * 1000:.0f} ms")
+    graph_key = key
+
+    # --- 2. ABox snapshot (graph stages + manual edits) ---
+    if os.path.exists(MANUAL_CHANGES):
+        pending.append(MANUAL_CHANGES)
+    record = state.get("abox", {})
+    if record.get("key") == abox_key(graph_key) and outputs_intact(record, [ABOX_FILE]) \
+            and not os.path.exists(changes_path(ABOX_FILE)):
+        print(f"[SKIP] abox: {ABOX_FILE} up to date")
+    else:
+        graph_store = build_abox_graph()
+        folded = fold_into_snapshot(graph_store.graph, ABOX_FILE, archive=MANUAL_CHANGES)
+        if folded:
+            graph_store.reindex()
+            print(f"[INFO] Folded {folded} pending changeset record(s) into {ABOX_FILE} (kept in {MANUAL_CHANGES})")
+        state["abox"] = {"key": abox_key(graph_key), "outputs": {ABOX_FILE: file_hash(ABOX_FILE)}}
+        built.append("abox")
+        print(f"[BUILD] abox: wrote {len(graph_store.graph)} triples to {ABOX_FILE}")
+    snapshot_key = state["abox"]["key"]
+
+    # --- 3. Inferred graph (RDFS + prerequisite propagation) ---
+    key = Stage("inferred", [TBOX_FILE, "app/materialize.py"], None).key(snapshot_key)
+    record = state.get("inferred", {})
+    if record.get("key") == key and outputs_intact(record, [inferred_path(ABOX_FILE)]):
+        print("[SKIP] inferred: up to date")
+    else:
+        tbox = rdflib.Graph().parse(TBOX_FILE, format="turtle")
+        build_inferred(ABOX_FILE, TBOX_FILE, build_abox_graph().graph, tbox)
+        state["inferred"] = {"key": key, "outputs": {inferred_path(ABOX_FILE): file_hash(inferred_path(ABOX_FILE))}}
+        built.append("inferred")
+
+    # --- 4. Reports ---
+    key = Stage("reports", REPORT_INPUTS, None).key(snapshot_key)
+    record = state.get("reports", {})
+    if record.get("key") == key and outputs_intact(record, REPORT_OUTPUTS):
+        print("[SKIP] reports: up to date")
+    else:
+        export_ontology_report.export_reports(build_abox_graph().graph)
+        state["reports"] = {"key": key, "outputs": {p: file_hash(p) for p in REPORT_OUTPUTS}}
+        built.append("reports")
+
+    save_state(state)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"[SUCCESS] Built {', '.join(built) or 'nothing'} in {elapsed:.0f} ms")
+    return built
+
+if __name__ == "__main__":
+    # Usage: python build_ontology.py [--force]
+    build(force="--force" in sys.argv[1:])
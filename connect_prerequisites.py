@@ -1,5 +1,5 @@
-import rdflib
-from rdflib import Namespace, RDF, RDFS, Literal
+from rdflib import Namespace
+from ontology_store import OntologyStore
 
 # Configuration
 FILE_PATH = "data/knowledge_graph/math_abox.ttl"
@@ -7,36 +7,15 @@ FILE_PATH = "data/knowledge_graph/math_abox.ttl"
 # Namespaces
 NS = Namespace("http://math.bot/ontology/")
 
-def connect_prerequisites():
-    print(f"[INFO] Loading {FILE_PATH}...")
-    g = rdflib.Graph()
-    g.parse(FILE_PATH, format="turtle")
+def connect_prerequisites(store=None):
+    # Standalone runs load and save the ABox; build_ontology.py passes a shared store.
+    standalone = store is None
+    if standalone:
+        store = OntologyStore(FILE_PATH, on_duplicate="skip")
     
-    # Helper to find URI by Label (Prioritize Section -> Concept -> others)
-    def find_node(label_name):
-        # Strict Section Search as requested
-        for s, p, o in g.triples((None, RDF.type, NS.Section)):
-            if str(g.value(s, RDFS.label)) == label_name:
-                return s
-        return None
-
-    # Helper to connect
+    # Helper to connect (Strict Section Search as requested)
     def connect(parent_label, child_label):
-        parent_uri = find_node(parent_label)
-        child_uri = find_node(child_label)
-        
-        if not parent_uri: 
-            print(f"[WARN] Parent Section '{parent_label}' not found.")
-            return
-        if not child_uri:
-            print(f"[WARN] Child Section '{child_label}' not found.")
-            return
-            
-        if (parent_uri, NS.prerequisiteOf, child_uri) in g:
-            return
-
-        g.add((parent_uri, NS.prerequisiteOf, child_uri))
-        print(f"[LINK] {parent_label} -> {child_label}")
+        store.link(parent_label, child_label, NS.prerequisiteOf, NS.Section)
 
     print("\n[INFO] Linking Full Curriculum (Section Only)...")
 
@@ -120,8 +99,8 @@ def connect_prerequisites():
 
     # --------------------------------------------------
     
-    print(f"\n[INFO] Saving updated graph to {FILE_PATH}...")
-    g.serialize(destination=FILE_PATH, format="turtle")
+    if standalone:
+        store.save(source="connect_prerequisites")
     print("[SUCCESS] Done.")
 
 if __name__ == "__main__":
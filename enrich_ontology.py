@@ -1,5 +1,5 @@
-import rdflib
-from rdflib import Namespace, RDFS, Literal
+from rdflib import Namespace, Literal
+from ontology_store import OntologyStore
 
 # Configuration
 INPUT_PROP_FILE = "data/raw/properties.md"
@@ -8,10 +8,11 @@ ABOX_FILE = "data/knowledge_graph/math_abox.ttl"
 # Namespaces
 NS = Namespace("http://math.bot/ontology/")
 
-def enrich_ontology():
-    print(f"[INFO] Loading {ABOX_FILE}...")
-    g = rdflib.Graph()
-    g.parse(ABOX_FILE, format="turtle")
+def enrich_ontology(store=None):
+    # Standalone runs load and save the ABox; build_ontology.py passes a shared store.
+    standalone = store is None
+    if standalone:
+        store = OntologyStore(ABOX_FILE)
     
     print(f"[INFO] Reading {INPUT_PROP_FILE}...")
     with open(INPUT_PROP_FILE, "r", encoding="utf-8") as f:
@@ -43,21 +44,19 @@ def enrich_ontology():
     # Assign to Ontology
     updated_count = 0
     # Iterate all Subjects in Graph
-    for s, p, o in g.triples((None, rdflib.RDF.type, NS.Subject)):
-        label = str(g.value(s, RDFS.label))
-        
+    for label, s in store.nodes(NS.Subject):
         if label in subj_props:
             props = subj_props[label]
-            g.add((s, NS.grade, Literal(props["grade"])))
-            g.add((s, NS.classification, Literal(props["classification"])))
+            store.add(s, NS.grade, Literal(props["grade"]))
+            store.add(s, NS.classification, Literal(props["classification"]))
             print(f"[UPDATE] {label}: Grade='{props['grade']}', Class='{props['classification']}'")
             updated_count += 1
         else:
             print(f"[WARN] Subject '{label}' not found in properties file.")
             
     print(f"[INFO] Updated {updated_count} subjects.")
-    print(f"[INFO] Saving to {ABOX_FILE}...")
-    g.serialize(destination=ABOX_FILE, format="turtle")
+    if standalone:
+        store.save(source="enrich_ontology")
     print("[SUCCESS] Done.")
 
 if __name__ == "__main__":
@@ -1,85 +1,151 @@
-import rdflib
-from rdflib import Namespace, RDF, RDFS
 import os
+import sys
+import csv
+import gzip
+import json
+from rdflib import Namespace, Literal, RDF, RDFS
+from app.changeset import load_with_changes, nt_lines
 
 # Configuration
 INPUT_FILE = "data/knowledge_graph/math_abox.ttl"
+REPORT_DIR = "data/report"
 HIERARCHY_FILE = "data/report/hierarchy_report.md"
 PREREQ_FILE = "data/report/prerequisites_report.md"
+FORMATS = ["md", "csv", "jsonl", "nt"]
 
 # Namespaces
 NS = Namespace("http://math.bot/ontology/")
 
-def export_reports():
-    print(f"[INFO] Loading {INPUT_FILE}...")
-    g = rdflib.Graph()
-    g.parse(INPUT_FILE, format="turtle")
-    
+# Single-pass hierarchy export
+# One ordered query yields one row per (Subject, Chapter, Section, Concept)
+# path; nodes without children still yield a row with the deeper columns
+# unbound. Each writer consumes the rows as a stream and only remembers the
+# previous row, so no nested per-level lists are built.
+LEVELS = ["subject", "chapter", "section", "concept"]
+LEVEL_CLASSES = [NS.Subject, NS.Chapter, NS.Section, NS.Concept]
+CHILD_PROPS = [NS.hasChapter, NS.hasSection, NS.hasConcept]
+
+HIERARCHY_QUERY = """
+PREFIX : <http://math.bot/ontology/>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+SELECT ?sub ?subLabel ?chap ?chapLabel ?sec ?secLabel ?con ?conLabel WHERE {
+    ?sub a :Subject ; rdfs:label ?subLabel .
+    OPTIONAL {
+        ?sub :hasChapter ?chap . ?chap rdfs:label ?chapLabel .
+        OPTIONAL {
+            ?chap :hasSection ?sec . ?sec rdfs:label ?secLabel .
+            OPTIONAL { ?sec :hasConcept ?con . ?con rdfs:label ?conLabel . }
+        }
+    }
+}
+ORDER BY ?subLabel ?sub ?chapLabel ?chap ?secLabel ?sec ?conLabel ?con
+"""
+
+def iter_hierarchy(g):
+    """
+    Yields ((sub, chap, sec, con), (sub_label, ...)) in hierarchy order,
+    siblings sorted by label. Unbound levels are None.
+    """
+    for row in g.query(HIERARCHY_QUERY):
+        uris = (row.sub, row.chap, row.sec, row.con)
+        labels = tuple(str(l) if l is not None else None
+                       for l in (row.subLabel, row.chapLabel, row.secLabel, row.conLabel))
+        yield uris, labels
+
+def _new_levels(uris, prev):
+    """Levels of `uris` that start a new node compared to the previous row."""
+    for level, uri in enumerate(uris):
+        if uri is None:
+            return
+        if uris[:level + 1] != prev[:level + 1]:
+            yield level
+
+# --- Writers (each takes the row stream and an open text file) ---
+
+def write_markdown(rows, f):
+    f.write("# Ontology Hierarchy Report\n")
+    f.write("Please edit this file to correct any structure errors.\n")
+    f.write("Format: \n- Subject\n  - Chapter\n    - Section\n      - #Concept\n\n")
+    prev = (None,) * 4
+    for uris, labels in rows:
+        for level in _new_levels(uris, prev):
+            marker = "#" if level == 3 else ""
+            f.write(f"{'  ' * level}- {marker}{labels[level]}\n")
+        prev = uris
+
+def write_csv(rows, f):
+    writer = csv.writer(f)
+    writer.writerow(LEVELS + [f"{level}_id" for level in LEVELS])
+    for uris, labels in rows:
+        ids = [str(u).split("/")[-1] if u is not None else "" for u in uris]
+        writer.writerow([l or "" for l in labels] + ids)
+
+def write_jsonl(rows, f):
+    for uris, labels in rows:
+        record = {}
+        for level, uri, label in zip(LEVELS, uris, labels):
+            if uri is None:
+                break
+            record[level] = {"id": str(uri).split("/")[-1], "label": label}
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def write_ntriples(rows, f):
+    # Type, label and parent link of every hierarchy node, each emitted once.
+    prev = (None,) * 4
+    for uris, labels in rows:
+        for level in _new_levels(uris, prev):
+            node = uris[level]
+            triples = [(node, RDF.type, LEVEL_CLASSES[level]), (node, RDFS.label, Literal(labels[level]))]
+            if level:
+                triples.append((uris[level - 1], CHILD_PROPS[level - 1], node))
+            for line in nt_lines(triples):  # rdflib escaping; n3() is not N-Triples for multi-line labels
+                f.write(line + "\n")
+        prev = uris
+
+WRITERS = {"md": write_markdown, "csv": write_csv, "jsonl": write_jsonl, "nt": write_ntriples}
+
+def _open_output(path, compress):
+    if compress:
+        return gzip.open(path + ".gz", "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+def export_hierarchy(g, fmt="md", path=None, compress=False):
+    """
+    Streams the hierarchy to `path` (default: data/report/hierarchy_report.<fmt>,
+    '.gz' appended when compressing). Returns the written path.
+    """
+    if path is None:
+        path = HIERARCHY_FILE if fmt == "md" else os.path.join(REPORT_DIR, f"hierarchy_report.{fmt}")
+    with _open_output(path, compress) as f:
+        WRITERS[fmt](iter_hierarchy(g), f)
+    return path + ".gz" if compress else path
+
+def export_reports(g=None, formats=("md",), compress=False):
+    if g is None:
+        print(f"[INFO] Loading {INPUT_FILE}...")
+        g = load_with_changes(INPUT_FILE)
+
     # Ensure raw directory exists
-    os.makedirs("data/report", exist_ok=True)
+    os.makedirs(REPORT_DIR, exist_ok=True)
 
     # --- 1. Export Hierarchy ---
-    print(f"[INFO] Generating {HIERARCHY_FILE}...")
-    with open(HIERARCHY_FILE, "w", encoding="utf-8") as f:
-        f.write("# Ontology Hierarchy Report\n")
-        f.write("Please edit this file to correct any structure errors.\n")
-        f.write("Format: \n- Subject\n  - Chapter\n    - Section\n      - #Concept\n\n")
-        
-        # Get Subjects
-        subjects = []
-        for s in g.subjects(RDF.type, NS.Subject):
-            label = g.value(s, RDFS.label)
-            subjects.append((s, str(label)))
-        
-        # Sort subjects logic (naive sort by label or URI)
-        subjects.sort(key=lambda x: x[1]) 
-
-        for sub_uri, sub_label in subjects:
-            f.write(f"- {sub_label}\n")
-            
-            # Get Chapters
-            chapters = []
-            for o in g.objects(sub_uri, NS.hasChapter):
-                label = g.value(o, RDFS.label)
-                chapters.append((o, str(label)))
-            chapters.sort(key=lambda x: x[1])
-
-            for chap_uri, chap_label in chapters:
-                f.write(f"  - {chap_label}\n")
-                
-                # Get Sections
-                sections = []
-                for o in g.objects(chap_uri, NS.hasSection):
-                    label = g.value(o, RDFS.label)
-                    sections.append((o, str(label)))
-                sections.sort(key=lambda x: x[1])
-
-                for sec_uri, sec_label in sections:
-                    f.write(f"    - {sec_label}\n")
-                    
-                    # Get Concepts
-                    concepts = []
-                    for o in g.objects(sec_uri, NS.hasConcept):
-                        label = g.value(o, RDFS.label)
-                        concepts.append((o, str(label)))
-                    concepts.sort(key=lambda x: x[1])
-
-                    for con_uri, con_label in concepts:
-                        f.write(f"      - #{con_label}\n")
+    for fmt in formats:
+        path = export_hierarchy(g, fmt, compress=compress)
+        print(f"[INFO] Generated {path}")
 
     # --- 2. Export Prerequisites ---
     print(f"[INFO] Generating {PREREQ_FILE}...")
     with open(PREREQ_FILE, "w", encoding="utf-8") as f:
         f.write("# Prerequisite Relationships\n")
         f.write("Format: Preconcept -> Postconcept\n\n")
-        
+
         prereqs = []
         for s, p, o in g.triples((None, NS.prerequisiteOf, None)):
             pre_label = g.value(s, RDFS.label)
             post_label = g.value(o, RDFS.label)
             if pre_label and post_label:
                 prereqs.append(f"{pre_label} -> {post_label}")
-        
+
         prereqs.sort()
         for link in prereqs:
             f.write(f"- {link}\n")
@@ -87,4 +153,11 @@ def export_reports():
     print("[SUCCESS] Reports generated.")
 
 if __name__ == "__main__":
-    export_reports()
+    # Usage: python export_ontology_report.py [md|csv|jsonl|nt|all ...] [--gzip]
+    args = [a for a in sys.argv[1:] if a != "--gzip"]
+    formats = FORMATS if "all" in args else (args or ["md"])
+    unknown = [fmt for fmt in formats if fmt not in WRITERS]
+    if unknown:
+        print(f"[ERROR] Unknown format(s): {', '.join(unknown)} (choose from {', '.join(FORMATS)})")
+        sys.exit(1)
+    export_reports(formats=formats, compress="--gzip" in sys.argv[1:])
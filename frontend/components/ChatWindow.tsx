@@ -1,6 +1,6 @@
 "use client";
 import { useState, useRef, useEffect } from 'react';
-import { Message } from '../types';
+import { ChatResponse, Message } from '../types';
 import MessageBubble from './MessageBubble';
 
 export default function ChatWindow() {
@@ -13,6 +13,7 @@ export default function ChatWindow() {
         }
     ]);
     const [isLoading, setIsLoading] = useState(false);
+    const [sessionId, setSessionId] = useState<string | undefined>(undefined);
     const bottomRef = useRef<HTMLDivElement>(null);
 
     useEffect(() => {
@@ -32,12 +33,13 @@ export default function ChatWindow() {
             const res = await fetch('http://localhost:8000/chat', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: userMsg.content }),
+                body: JSON.stringify({ message: userMsg.content, session_id: sessionId }),
             });
 
             if (!res.ok) throw new Error('Network response was not ok');
 
-            const data = await res.json();
+            const data: ChatResponse = await res.json();
+            if (data.session_id) setSessionId(data.session_id);
 
             const aiMsg: Message = {
                 id: (Date.now() + 1).toString(),
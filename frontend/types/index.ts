@@ -11,3 +11,9 @@ export interface Message {
     content: string;
     evidence?: Evidence[];
 }
+
+export interface ChatResponse {
+    answer: string;
+    evidence: Evidence[];
+    session_id?: string;
+}
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import numpy as np
+
+# Configuration
+LAYOUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data/layout")
+
+# Bump when the algorithm or its parameters change so stored layouts are
+# recomputed instead of reused.
+LAYOUT_REVISION = 1
+
+def compute_layout(node_ids, edges, iterations=300, seed=42, scale=None, gravity=0.05):
+    """
+    Vectorized Fruchterman-Reingold layout (NumPy, O(N^2) per iteration).
+
+    Args:
+        node_ids (list[str]): Node IDs.
+        edges (list[tuple[str, str]]): (source, target) pairs; direction is ignored.
+        iterations (int): Cooling steps.
+        seed (int): RNG seed, so the same graph always gets the same layout.
+        scale (float): Radius of the output in vis.js pixels
+                       (defaults to 140px per sqrt(node count)).
+        gravity (float): Pull towards the origin so disconnected parts
+                         (e.g. TBox terms) do not drift away.
+
+    Returns:
+        dict: node_id -> (x, y)
+    """
+    n = len(node_ids)
+    if n == 0:
+        return {}
+
+    index = {nid: i for i, nid in enumerate(node_ids)}
+    adjacency = np.zeros((n, n))
+    for s, o in edges:
+        if s in index and o in index and s != o:
+            adjacency[index[s], index[o]] = 1.0
+            adjacency[index[o], index[s]] = 1.0
+
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2)) - 0.5
+    k = np.sqrt(1.0 / n)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]               # (n, n, 2)
+        distance = np.linalg.norm(delta, axis=-1)
+        np.clip(distance, 0.01, None, out=distance)
+        # repulsion k^2/d, attraction d^2/k along edges (both scaled by delta/d)
+        force = k * k / distance ** 2 - adjacency * distance / k
+        displacement = np.einsum("ijk,ij->ik", delta, force) - gravity * pos
+        length = np.linalg.norm(displacement, axis=-1)
+        np.clip(length, 0.01, None, out=length)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    # Normalize to vis.js pixel coordinates. The 95th percentile radius maps
+    # to `scale` so a few stray nodes cannot squash the rest together;
+    # those strays are then pulled in to the layout's rim.
+    pos -= np.median(pos, axis=0)
+    radius = np.linalg.norm(pos, axis=-1)
+    extent = np.percentile(radius, 95) or 1.0
+    scale = scale or 140.0 * np.sqrt(n)
+    pos *= scale / extent
+    radius *= scale / extent
+    rim = 1.2 * scale
+    outside = radius > rim
+    pos[outside] *= (rim / radius[outside])[:, None]
+
+    return {nid: (round(float(x), 1), round(float(y), 1)) for nid, (x, y) in zip(node_ids, pos)}
+
+_loaded = {}  # path -> positions, so views never re-read the file
+
+def layout_path(version, layout_dir=LAYOUT_DIR):
+    return os.path.join(layout_dir, f"layout_{version}_r{LAYOUT_REVISION}.json")
+
+def load_or_compute_layout(version, node_ids, edges, layout_dir=LAYOUT_DIR):
+    """
+    Returns the stored layout for this graph version, computing and saving
+    it first if needed. Layouts are computed once per version, never per view.
+    """
+    path = layout_path(version, layout_dir)
+    if path in _loaded:
+        return _loaded[path]
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            _loaded[path] = {nid: tuple(xy) for nid, xy in json.load(f).items()}
+        return _loaded[path]
+
+    start = time.perf_counter()
+    positions = compute_layout(node_ids, edges)
+    print(f"[LAYOUT] Computed {len(positions)} node positions in {time.perf_counter() - start:.2f}s")
+
+    os.makedirs(layout_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(positions, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"[LAYOUT] Saved to {path}")
+    _loaded[path] = positions
+    return positions
+
+def apply_layout(nodes, positions):
+    """
+    Pins vis.js node dicts to precomputed coordinates (in place).
+    """
+    for node in nodes:
+        xy = positions.get(node["id"])
+        if xy:
+            node["x"], node["y"] = xy
+    return nodes
+
+if __name__ == "__main__":
+    # Offline layout stage: run once after the ontology changes.
+    from visualize_graph import load_default_graph, get_node_table
+
+    g = load_default_graph()
+    if g is not None:
+        table = get_node_table(g)
+        load_or_compute_layout(table.version, [str(n) for n in table.nodes],
+                               [(str(s), str(o)) for s, _, o in table.edges])
@@ -1,6 +1,8 @@
 import re
 import rdflib
 from rdflib import Namespace, RDF, RDFS, Literal
+from app.changeset import write_snapshot
+from stable_ids import stable_id
 
 # Configuration
 INPUT_FILE = "data/raw/curr.md"
@@ -10,7 +12,8 @@ OUTPUT_FILE = "data/knowledge_graph/math_abox.ttl"
 NS = Namespace("http://math.bot/ontology/")
 OWL = Namespace("http://www.w3.org/2002/07/owl#")
 
-def generate_skeleton():
+def parse_curriculum(input_file=INPUT_FILE):
+    """Parses one curriculum file into a fresh ABox graph (nothing is written)."""
     g = rdflib.Graph()
     g.bind("", NS)
     g.bind("owl", OWL)
@@ -19,15 +22,16 @@ def generate_skeleton():
     # State variables
     current_subject = None
     current_chapter = None
+    path = []  # labels of the current Subject/Chapter, for stable IDs
     
-    # Counters for unique IDs
+    # Counters (for the summary only; URIs come from stable_id)
     sub_count = 0
     chap_count = 0
     sec_count = 0
     con_count = 0
     
-    print(f"[INFO] Reading {INPUT_FILE}...")
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+    print(f"[INFO] Reading {input_file}...")
+    with open(input_file, "r", encoding="utf-8") as f:
         lines = f.readlines()
 
     for line in lines:
@@ -58,7 +62,7 @@ def generate_skeleton():
                 
             # Create Section
             sec_count += 1
-            sec_uri = NS[f"Sec_{sec_count:03d}"]
+            sec_uri = stable_id("Section", *path, section_name)
             g.add((sec_uri, RDF.type, NS.Section))
             g.add((sec_uri, RDFS.label, Literal(section_name)))
             g.add((current_chapter, NS.hasSection, sec_uri))
@@ -66,7 +70,7 @@ def generate_skeleton():
             # Create Concepts
             for con_name in concepts:
                 con_count += 1
-                con_uri = NS[f"Con_{con_count:04d}"]
+                con_uri = stable_id("Concept", *path, section_name, con_name)
                 g.add((con_uri, RDF.type, NS.Concept))
                 g.add((con_uri, RDFS.label, Literal(con_name)))
                 g.add((sec_uri, NS.hasConcept, con_uri))
@@ -81,8 +85,9 @@ def generate_skeleton():
                  continue
 
             chap_count += 1
-            chap_uri = NS[f"Chap_{chap_count:03d}"]
+            chap_uri = stable_id("Chapter", *path[:1], chapter_name)
             current_chapter = chap_uri
+            path = path[:1] + [chapter_name]
             
             g.add((chap_uri, RDF.type, NS.Chapter))
             g.add((chap_uri, RDFS.label, Literal(chapter_name)))
@@ -95,8 +100,9 @@ def generate_skeleton():
             
             sub_name = line
             sub_count += 1
-            sub_uri = NS[f"Sub_{sub_count:02d}"]
+            sub_uri = stable_id("Subject", sub_name)
             current_subject = sub_uri
+            path = [sub_name]
             # Reset chapter? Depending on file structure, strictly speaking yes.
             # But chapters belong to subject.
             
@@ -106,9 +112,13 @@ def generate_skeleton():
 
     print(f"[INFO] Genereated {len(g)} triples.")
     print(f"Subjects: {sub_count}, Chapters: {chap_count}, Sections: {sec_count}, Concepts: {con_count}")
-    
-    # Serialize
-    g.serialize(destination=OUTPUT_FILE, format="turtle")
+    return g
+
+def generate_skeleton():
+    g = parse_curriculum()
+
+    # Serialize (a regenerated ABox is a new base snapshot; pending changesets are dropped)
+    write_snapshot(g, OUTPUT_FILE)
     print(f"[SUCCESS] Saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import re
 import rdflib
 from rdflib import Namespace, RDF, RDFS, Literal
+from app.changeset import write_snapshot
+from stable_ids import stable_id
 
 # Configuration
 INPUT_FILE = "data/report/hierarchy_report_v2.md"
@@ -11,7 +13,8 @@ NS = Namespace("http://math.bot/ontology/")
 OWL = Namespace("http://www.w3.org/2002/07/owl#")
 XSD = Namespace("http://www.w3.org/2001/XMLSchema#")
 
-def import_hierarchy():
+def build_hierarchy(input_file=INPUT_FILE):
+    """Parses the hierarchy report into a fresh ABox graph (nothing is written)."""
     g = rdflib.Graph()
     g.bind("", NS)
     g.bind("owl", OWL)
@@ -22,15 +25,16 @@ def import_hierarchy():
     current_subject = None
     current_chapter = None
     current_section = None
+    path = []  # labels of the current Subject/Chapter/Section, for stable IDs
     
-    # Counters for unique IDs
+    # Counters (for the summary only; URIs come from stable_id)
     sub_count = 0
     chap_count = 0
     sec_count = 0
     con_count = 0
     
-    print(f"[INFO] Reading {INPUT_FILE}...")
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+    print(f"[INFO] Reading {input_file}...")
+    with open(input_file, "r", encoding="utf-8") as f:
         lines = f.readlines()
 
     for line in lines:
@@ -63,7 +67,7 @@ def import_hierarchy():
                  continue
                  
             con_count += 1
-            con_uri = NS[f"Con_{con_count:04d}"]
+            con_uri = stable_id("Concept", *path, con_name)
             g.add((con_uri, RDF.type, NS.Concept))
             g.add((con_uri, RDFS.label, Literal(con_name)))
             g.add((current_section, NS.hasConcept, con_uri))
@@ -72,8 +76,9 @@ def import_hierarchy():
             # Subject
             sub_name = content
             sub_count += 1
-            sub_uri = NS[f"Sub_{sub_count:02d}"]
+            sub_uri = stable_id("Subject", sub_name)
             current_subject = sub_uri
+            path = [sub_name]
             current_chapter = None # Reset
             current_section = None
             
@@ -88,8 +93,9 @@ def import_hierarchy():
                 continue
                 
             chap_count += 1
-            chap_uri = NS[f"Chap_{chap_count:03d}"]
+            chap_uri = stable_id("Chapter", *path[:1], chap_name)
             current_chapter = chap_uri
+            path = path[:1] + [chap_name]
             current_section = None # Reset
             
             g.add((chap_uri, RDF.type, NS.Chapter))
@@ -104,8 +110,9 @@ def import_hierarchy():
                 continue
                 
             sec_count += 1
-            sec_uri = NS[f"Sec_{sec_count:03d}"]
+            sec_uri = stable_id("Section", *path[:2], sec_name)
             current_section = sec_uri
+            path = path[:2] + [sec_name]
             
             g.add((sec_uri, RDF.type, NS.Section))
             g.add((sec_uri, RDFS.label, Literal(sec_name)))
@@ -113,9 +120,13 @@ def import_hierarchy():
 
     print(f"[INFO] Generated {len(g)} triples.")
     print(f"Subjects: {sub_count}, Chapters: {chap_count}, Sections: {sec_count}, Concepts: {con_count}")
-    
-    # Serialize
-    g.serialize(destination=OUTPUT_FILE, format="turtle")
+    return g
+
+def import_hierarchy():
+    g = build_hierarchy()
+
+    # Serialize (a regenerated ABox is a new base snapshot; pending changesets are dropped)
+    write_snapshot(g, OUTPUT_FILE)
     print(f"[SUCCESS] Saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
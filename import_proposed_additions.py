@@ -1,5 +1,5 @@
-import rdflib
-from rdflib import Namespace, RDF, RDFS, Literal
+from rdflib import Namespace
+from ontology_store import OntologyStore
 import re
 
 # Configuration
@@ -9,25 +9,17 @@ GRAPH_FILE = "data/knowledge_graph/math_abox.ttl"
 # Namespaces
 NS = Namespace("http://math.bot/ontology/")
 
-def import_additions():
-    print(f"[INFO] Loading {GRAPH_FILE}...")
-    g = rdflib.Graph()
-    g.parse(GRAPH_FILE, format="turtle")
-    
-    # Helper to find URI by Label
-    def find_concept(label_name):
-        label_name = label_name.strip()
-        for s, p, o in g.triples((None, RDF.type, NS.Concept)):
-            label = g.value(s, RDFS.label)
-            if label and str(label) == label_name:
-                return s
-        return None
+def import_additions(store=None):
+    # Standalone runs load and save the ABox; build_ontology.py passes a shared store.
+    standalone = store is None
+    if standalone:
+        store = OntologyStore(GRAPH_FILE, on_duplicate="skip")
 
     print(f"[INFO] Reading {INPUT_FILE}...")
     with open(INPUT_FILE, "r", encoding="utf-8") as f:
         lines = f.readlines()
         
-    added_count = 0
+    pairs = []
     
     for line in lines:
         if "->" not in line: 
@@ -56,21 +48,13 @@ def import_additions():
         pre_text = re.sub(r'\(.*?\)', '', pre_text).strip()
         post_text = re.sub(r'\(.*?\)', '', post_text).strip()
         
-        pre_uri = find_concept(pre_text)
-        post_uri = find_concept(post_text)
-        
-        if pre_uri and post_uri:
-            g.add((pre_uri, NS.prerequisiteOf, post_uri))
-            print(f"[ADD] {pre_text} -> {post_text}")
-            added_count += 1
-        else:
-            if not pre_uri: print(f"[WARN] Pre-concept '{pre_text}' not found in ontology.")
-            if not post_uri: print(f"[WARN] Post-concept '{post_text}' not found in ontology.")
+        pairs.append((pre_text, post_text))
 
+    added_count = store.bulk_link(pairs, NS.prerequisiteOf, NS.Concept)
     print(f"[INFO] Added {added_count} new prerequisite links.")
     
-    print(f"[INFO] Saving to {GRAPH_FILE}...")
-    g.serialize(destination=GRAPH_FILE, format="turtle")
+    if standalone:
+        store.save(source="import_proposed_additions")
     print("[SUCCESS] Done.")
 
 if __name__ == "__main__":
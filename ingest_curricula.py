@@ -0,0 +1,99 @@
+import os
+import sys
+import glob
+import json
+import time
+import rdflib
+from concurrent.futures import ProcessPoolExecutor
+from rdflib import Namespace, RDFS
+
+from import_curriculum import parse_curriculum
+
+# Configuration
+CURRICULA_DIR = "data/raw/curricula"
+DEFAULT_FILES = ["data/raw/curr.md"]
+OUTPUT_FILE = "data/knowledge_graph/curricula.trig"
+LABEL_INDEX_FILE = "data/knowledge_graph/curricula_labels.json"
+
+# Namespaces
+NS = Namespace("http://math.bot/ontology/")
+CURRICULUM = Namespace("http://math.bot/curriculum/")
+
+# Multi-curriculum ingestion
+# Every curriculum file (e.g. data/raw/curricula/2015.md, 2022.md) is parsed
+# by its own worker process into a named graph <http://math.bot/curriculum/KEY>.
+# Workers return the triples as plain term tuples (pickled, not re-parsed)
+# plus a per-file label index, so the parent only bulk-adds them with addN;
+# total time scales with cores, not file count.
+# Node URIs come from stable_ids, so a concept with the same curriculum path
+# has the same URI in every revision and can be compared across graphs.
+
+def curriculum_key(path):
+    """data/raw/curricula/2022.md -> '2022'"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+def graph_uri(key):
+    return CURRICULUM[key]
+
+def _ingest_one(path):
+    """Worker: parse one file. Returns (key, [(s, p, o)], {label: [uri]}, seconds)."""
+    start = time.perf_counter()
+    g = parse_curriculum(path)
+    labels = {}
+    for s, lbl in g.subject_objects(RDFS.label):
+        labels.setdefault(str(lbl), []).append(str(s))
+    return curriculum_key(path), list(g), labels, time.perf_counter() - start
+
+def ingest_curricula(paths, workers=None):
+    """
+    Parses `paths` in parallel into one rdflib.Dataset (one named graph per
+    file). Returns (dataset, label_index) where
+    label_index[label] = {curriculum_key: [uri, ...]}.
+    """
+    keys = [curriculum_key(p) for p in paths]
+    duplicates = {k for k in keys if keys.count(k) > 1}
+    if duplicates:
+        raise ValueError(f"Curriculum keys must be unique: {sorted(duplicates)}")
+
+    dataset = rdflib.Dataset()
+    dataset.bind("", NS)
+    dataset.bind("curr", CURRICULUM)
+    label_index = {}
+
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for key, triples, labels, seconds in pool.map(_ingest_one, paths):
+            graph = dataset.graph(graph_uri(key))
+            graph.addN((s, p, o, graph) for s, p, o in triples)
+            for label, uris in labels.items():
+                label_index.setdefault(label, {})[key] = sorted(uris)
+            print(f"[INFO] {key}: {len(graph)} triples ({seconds * 1000:.0f} ms in worker)")
+    return dataset, label_index
+
+def save_dataset(dataset, label_index, output_file=OUTPUT_FILE, index_file=LABEL_INDEX_FILE):
+    tmp_path = output_file + ".tmp"
+    dataset.serialize(destination=tmp_path, format="trig")
+    os.replace(tmp_path, output_file)
+    with open(index_file, "w", encoding="utf-8") as f:
+        json.dump(label_index, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+def load_dataset(path=OUTPUT_FILE):
+    dataset = rdflib.Dataset()
+    dataset.parse(path, format="trig")
+    return dataset
+
+def load_label_index(path=LABEL_INDEX_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    # Usage: python ingest_curricula.py [file.md ...]
+    #   (default: data/raw/curricula/*.md, else data/raw/curr.md)
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(CURRICULA_DIR, "*.md"))) or DEFAULT_FILES
+    start = time.perf_counter()
+    dataset, label_index = ingest_curricula(paths)
+    save_dataset(dataset, label_index)
+    shared = sum(1 for by_key in label_index.values() if len(by_key) > 1)
+    print(f"[INFO] {len(label_index)} labels, {shared} shared by several curricula")
+    print(f"[SUCCESS] Ingested {len(paths)} curricula in {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"-> {OUTPUT_FILE}, {LABEL_INDEX_FILE}")
@@ -0,0 +1,202 @@
+from rdflib import Namespace, RDF, RDFS
+from app.changeset import load_with_changes, append_changeset, write_snapshot
+
+# Configuration
+ABOX_FILE = "data/knowledge_graph/math_abox.ttl"
+
+# Namespaces
+NS = Namespace("http://math.bot/ontology/")
+
+# Parent -> child, Subject > Chapter > Section > Concept
+HIERARCHY_PROPS = (NS.hasChapter, NS.hasSection, NS.hasConcept)
+
+
+class DuplicateLabelError(LookupError):
+    """Raised by OntologyStore.find(on_duplicate="error") for ambiguous labels."""
+
+
+class OntologyStore:
+    """
+    Loads an ABox once and keeps label -> URI indexes per class, so ETL
+    scripts get O(1) lookups instead of scanning every node per call.
+
+    Duplicate labels are kept (find_all returns every match); `find` resolves
+    them according to `on_duplicate`:
+        "first" - warn once and pick the lowest URI (stable, but since URIs
+                  are hashes not a meaningful choice; avoid in ETL)
+        "error" - raise DuplicateLabelError
+        "skip"  - warn once and return None
+    `link` first narrows ambiguous labels to the nodes under the same Subject
+    as the other end (e.g. '정적분' -> '정적분의 활용' within 수학II) and only
+    falls back to `on_duplicate` if that does not leave a single pair.
+
+    The graph is the Turtle base plus its changeset log (app/changeset.py);
+    `save` appends only the triples added/removed since loading.
+
+    Usage:
+        store = OntologyStore(on_duplicate="skip")
+        store.link("지수", "로그", NS.prerequisiteOf, NS.Section)
+        store.save()
+    """
+
+    def __init__(self, path=ABOX_FILE, fmt="turtle", on_duplicate="first", graph=None):
+        self.path = path
+        self.fmt = fmt
+        self.on_duplicate = on_duplicate
+        if graph is None:
+            print(f"[INFO] Loading {path}...")
+            graph = load_with_changes(path, fmt)
+        self.graph = graph
+        self.added = []
+        self.removed = []
+        self._warned = set()
+        self.reindex()
+
+    def reindex(self):
+        """Rebuilds the indexes, e.g. after changes were applied to `graph` directly."""
+        self.labels = {}   # uri -> label
+        self.types = {}    # uri -> {class}
+        self.index = {}    # class (None = any) -> label -> [uri]
+        self.parents = {}  # uri -> hierarchy parent
+        for s, lbl in self.graph.subject_objects(RDFS.label):
+            self.labels.setdefault(s, str(lbl))
+        for s, cls in self.graph.subject_objects(RDF.type):
+            self.types.setdefault(s, set()).add(cls)
+        for prop in HIERARCHY_PROPS:
+            for parent, child in self.graph.subject_objects(prop):
+                self.parents.setdefault(child, parent)
+        for s, lbl in self.labels.items():
+            self._index_node(s, lbl)
+        for by_label in self.index.values():
+            for uris in by_label.values():
+                uris.sort()
+
+    def _index_node(self, uri, label):
+        for cls in (None, *self.types.get(uri, ())):
+            uris = self.index.setdefault(cls, {}).setdefault(label, [])
+            if uri not in uris:
+                uris.append(uri)
+
+    # --- Lookup ---
+
+    def find_all(self, label, cls=None):
+        """Every URI with this exact label (optionally restricted to `cls`)."""
+        return list(self.index.get(cls, {}).get(label.strip(), ()))
+
+    def find(self, label, cls=None):
+        """Single URI for `label`, or None. See class docstring for duplicates."""
+        uris = self.find_all(label, cls)
+        if not uris:
+            return None
+        if len(uris) > 1:
+            if self.on_duplicate == "error":
+                raise DuplicateLabelError(f"'{label}' matches {len(uris)} nodes: {uris}")
+            if (label, cls) not in self._warned:
+                self._warned.add((label, cls))
+                names = ", ".join(str(u).split("/")[-1] for u in uris)
+                chosen = "none" if self.on_duplicate == "skip" else str(uris[0]).split("/")[-1]
+                print(f"[WARN] Label '{label}' is ambiguous ({names}); using {chosen}.")
+            if self.on_duplicate == "skip":
+                return None
+        return uris[0]
+
+    def label(self, uri):
+        return self.labels.get(uri)
+
+    def subject_of(self, uri):
+        """Top of `uri`'s hierarchy path (its Subject), or `uri` itself."""
+        seen = {uri}
+        while uri in self.parents and self.parents[uri] not in seen:
+            uri = self.parents[uri]
+            seen.add(uri)
+        return uri
+
+    def _resolve_pair(self, src_label, dst_label, cls):
+        """(src, dst) for `link`, disambiguating duplicates by shared Subject."""
+        srcs = self.find_all(src_label, cls)
+        dsts = self.find_all(dst_label, cls)
+        if len(srcs) > 1 or len(dsts) > 1:
+            pairs = [(s, d) for s in srcs for d in dsts if self.subject_of(s) == self.subject_of(d)]
+            if len(pairs) == 1:
+                return pairs[0]
+        return self.find(src_label, cls), self.find(dst_label, cls)
+
+    def nodes(self, cls):
+        """(label, uri) pairs for every node of `cls`, in label order."""
+        return [(lbl, uri) for lbl, uris in sorted(self.index.get(cls, {}).items()) for uri in uris]
+
+    # --- Mutation ---
+
+    def add(self, s, p, o):
+        """Adds a triple and keeps the indexes current. Returns False if it existed."""
+        if (s, p, o) in self.graph:
+            return False
+        self.graph.add((s, p, o))
+        self._record((s, p, o), self.added, self.removed)
+        if p == RDFS.label:
+            self.labels.setdefault(s, str(o))
+            self._index_node(s, self.labels[s])
+        elif p == RDF.type:
+            self.types.setdefault(s, set()).add(o)
+            if s in self.labels:
+                self._index_node(s, self.labels[s])
+        elif p in HIERARCHY_PROPS:
+            self.parents.setdefault(o, s)
+        return True
+
+    def link(self, src_label, dst_label, prop, cls=None):
+        """Links two nodes found by label. Returns True if a triple was added."""
+        kind = str(cls).split("/")[-1] if cls else "Node"
+        src, dst = self._resolve_pair(src_label, dst_label, cls)
+        if not src:
+            if self.find_all(src_label, cls):
+                return False  # ambiguous, already reported by find
+            print(f"[WARN] {kind} '{src_label}' not found.")
+            return False
+        if not dst:
+            if self.find_all(dst_label, cls):
+                return False
+            print(f"[WARN] {kind} '{dst_label}' not found.")
+            return False
+        if not self.add(src, prop, dst):
+            return False
+        print(f"[LINK] {src_label} -> {dst_label}")
+        return True
+
+    def bulk_link(self, pairs, prop, cls=None):
+        """Links every (src_label, dst_label) pair. Returns the number added."""
+        return sum(1 for src, dst in pairs if self.link(src, dst, prop, cls))
+
+    def remove(self, s, p, o):
+        """Removes a triple (labels/types are not unindexed). Returns False if absent."""
+        if (s, p, o) not in self.graph:
+            return False
+        self.graph.remove((s, p, o))
+        self._record((s, p, o), self.removed, self.added)
+        return True
+
+    def _record(self, triple, pending, opposite):
+        # An edit that undoes a pending one cancels it instead of being logged
+        # (save writes removals before additions, so both would not round-trip).
+        if triple in opposite:
+            opposite.remove(triple)
+        else:
+            pending.append(triple)
+
+    def save(self, source="", snapshot=False):
+        """
+        Appends the pending additions/removals as one changeset, so the cost
+        is proportional to the edit. `snapshot=True` instead rewrites the
+        Turtle base (and clears the log), e.g. after a full regeneration.
+        """
+        if snapshot:
+            print(f"[INFO] Writing snapshot {self.path}...")
+            write_snapshot(self.graph, self.path, self.fmt)
+        elif not self.added and not self.removed:
+            print(f"[INFO] No changes; {self.path} left untouched.")
+            return
+        else:
+            count = append_changeset(self.path, self.added, self.removed, source)
+            print(f"[INFO] Appended {count} change(s) to the changeset log of {self.path}")
+        self.added = []
+        self.removed = []
@@ -0,0 +1,122 @@
+import sys
+import json
+import hashlib
+import unicodedata
+import rdflib
+from rdflib import Namespace, RDF, RDFS
+
+# Configuration
+ABOX_FILE = "data/knowledge_graph/math_abox.ttl"
+MIGRATION_FILE = "data/knowledge_graph/id_migration.json"
+
+# Namespaces
+NS = Namespace("http://math.bot/ontology/")
+
+# Content-addressed node IDs
+# A node's URI is derived from its place in the curriculum
+# (Subject / Chapter / Section / Concept labels), not from its position in
+# the source file, so inserting a section no longer renumbers everything
+# after it and URI-keyed caches, traces and links stay valid.
+PREFIXES = {"Subject": "Sub", "Chapter": "Chap", "Section": "Sec", "Concept": "Con"}
+PARENT_PROPS = {"Chapter": NS.hasChapter, "Section": NS.hasSection, "Concept": NS.hasConcept}
+DIGEST_LENGTH = 10
+
+def normalize_label(label):
+    """NFC + collapsed whitespace, so cosmetic edits do not change IDs."""
+    return " ".join(unicodedata.normalize("NFC", str(label)).split())
+
+def stable_id(kind, *path):
+    """
+    Deterministic URI for a node of `kind` at `path` (ancestor labels first).
+    e.g. stable_id("Concept", "공통수학1", "다항식", "다항식의 연산", "다항식의 덧셈")
+    """
+    key = kind + ":" + "/".join(normalize_label(p) for p in path)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:DIGEST_LENGTH]
+    return NS[f"{PREFIXES[kind]}_{digest}"]
+
+def node_kind(g, uri):
+    for kind in PREFIXES:
+        if (uri, RDF.type, NS[kind]) in g:
+            return kind
+    return None
+
+def node_path(g, uri, kind):
+    """Ancestor labels + own label, following hasChapter/hasSection/hasConcept upwards."""
+    path = [str(g.value(uri, RDFS.label))]
+    while kind in PARENT_PROPS:
+        parents = sorted(g.subjects(PARENT_PROPS[kind], uri))
+        if not parents:
+            break
+        uri = parents[0]
+        kind = node_kind(g, uri)
+        path.insert(0, str(g.value(uri, RDFS.label)))
+    return path
+
+def build_migration_map(g):
+    """
+    old URI -> stable URI for every Subject/Chapter/Section/Concept node.
+    Nodes that already carry their stable ID map to themselves.
+    """
+    mapping = {}
+    for kind in PREFIXES:
+        for uri in g.subjects(RDF.type, NS[kind]):
+            mapping[uri] = stable_id(kind, *node_path(g, uri, kind))
+    return mapping
+
+def migrate_graph(g, mapping):
+    """Returns a copy of `g` with every mapped URI replaced."""
+    migrated = rdflib.Graph()
+    for prefix, namespace in g.namespaces():
+        migrated.bind(prefix, namespace)
+    for s, p, o in g:
+        migrated.add((mapping.get(s, s), p, mapping.get(o, o)))
+    return migrated
+
+def migrate_abox(abox_file=ABOX_FILE, migration_file=MIGRATION_FILE):
+    """
+    Rewrites the ABox (base + changeset log) to stable IDs and records the
+    old -> new map, merged with any earlier migrations, in `migration_file`.
+    """
+    from app.changeset import load_with_changes, write_snapshot
+
+    g = load_with_changes(abox_file)
+    mapping = build_migration_map(g)
+    changed = {str(old): str(new) for old, new in mapping.items() if old != new}
+    if not changed:
+        print("[INFO] All nodes already use stable IDs.")
+        return {}
+
+    collisions = len(mapping) - len(set(mapping.values()))
+    if collisions:
+        print(f"[WARN] {collisions} node(s) share a curriculum path and will be merged.")
+
+    try:
+        with open(migration_file, "r", encoding="utf-8") as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        history = {}
+    # Re-point earlier entries so every historical ID resolves in one hop.
+    history = {old: changed.get(new, new) for old, new in history.items()}
+    history.update(changed)
+
+    write_snapshot(migrate_graph(g, mapping), abox_file)
+    with open(migration_file, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    print(f"[SUCCESS] Migrated {len(changed)} node IDs; map saved to {migration_file}")
+    return changed
+
+def load_migration_map(migration_file=MIGRATION_FILE):
+    """old URI string -> current URI string (empty if never migrated)."""
+    try:
+        with open(migration_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+if __name__ == "__main__":
+    # Usage: python stable_ids.py migrate
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        migrate_abox()
+    else:
+        print("Usage: python stable_ids.py migrate")
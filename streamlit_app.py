@@ -25,20 +25,26 @@ except Exception as e:
 # If the key is still missing (neither in secrets nor .env loaded yet), we should check.
 # Note: reasoning_engine loads .env itself, but for Cloud we need to be sure.
 if "GOOGLE_API_KEY" not in os.environ and "GOOGLE_API_KEY" not in st.secrets:
-    # If we are local, reasoning_engine might find .env, so we can try-except the import
+    # If we are local, reasoning_engine might find .env; the check below runs after it is imported
     pass
 
-try:
-    from reasoning_engine import generate_sparql, execute_sparql, generate_answer
-except ValueError as e:
+from reasoning_engine import (generate_sparql, execute_sparql, generate_answer, model_available,
+                              api_key_configured, warm_up_models)
+if not api_key_configured():
     st.error("🚨 **Deployment Error: Google API Key Missing**")
     st.warning("Please configure your Secrets in Streamlit Cloud Settings.")
     st.code('GOOGLE_API_KEY = "AIzaSy..."', language="toml")
     st.info("Go to 'Manage app' > 'Settings' > 'Secrets' and paste your key.")
     st.stop()
 
-from graph_loader import load_graph, generate_schema_info
-from visualize_graph import visualize_ontology
+from graph_loader import load_graph, generate_schema_info, get_mention_extractor
+from model_router import CircuitOpen
+from local_answer import local_answer
+from materialize import load_inferred
+from visualize_graph import build_base_visualization, resolve_highlight_ids, focus_node_ids, COMPONENT_DIR
+import streamlit.components.v1 as components
+from session_store import create_session_store, format_history
+import uuid
 
 # Page Config
 st.set_page_config(page_title="K-Math Ontology Chatbot", layout="wide")
@@ -46,34 +52,34 @@ st.set_page_config(page_title="K-Math Ontology Chatbot", layout="wide")
 # Paths
 TBOX_PATH = "data/ontology/math_tbox.ttl"
 DATA_PATH = "data/knowledge_graph/math_abox.ttl"
-VISUALIZATION_PATH = "math_graph.html"
+
+# Static ontology map component: base graph is fetched once per version,
+# reruns only ship the highlighted node IDs.
+ontology_map = components.declare_component("ontology_map", path=COMPONENT_DIR)
 
 # Session State Initialization
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 if "graph_loaded" not in st.session_state:
     st.session_state.graph_loaded = False
-if "viz_html" not in st.session_state:
-    st.session_state.viz_html = None
+if "highlight_ids" not in st.session_state:
+    st.session_state.highlight_ids = []
+if "focus_ids" not in st.session_state:
+    st.session_state.focus_ids = []
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+# Prompt context lives in a bounded store; chat_history is only for display.
+@st.cache_resource
+def get_session_store():
+    return create_session_store()
 
-# Sidebar
-with st.sidebar:
-    st.header("🗺️ Ontology Map")
-    
-    # Simple Reset Button
-    if st.button("Reset View"):
-        st.session_state.viz_html = None # Reset visualization
-        st.rerun()
+# Gemini client setup runs in the background while the graph loads (once per process)
+@st.cache_resource
+def start_model_warmup():
+    return warm_up_models()
 
-    # Visualization
-    if st.session_state.viz_html:
-        st.components.v1.html(st.session_state.viz_html, height=700, scrolling=True)
-    elif os.path.exists(VISUALIZATION_PATH):
-        with open(VISUALIZATION_PATH, 'r', encoding='utf-8') as f:
-            html_data = f.read()
-        st.components.v1.html(html_data, height=700, scrolling=True)
-    else:
-        st.info("Visualization loading...")
+start_model_warmup()
 
 # Main Load Logic
 @st.cache_resource
@@ -81,16 +87,37 @@ def get_graph_data():
     g = load_graph(DATA_PATH)
     t = load_graph(TBOX_PATH)
     full_g = g + t
+    # Same graph the API queries (tenant.query_graph): ABox + TBox + materialized inferences
+    query_g = full_g + load_inferred(DATA_PATH, TBOX_PATH, g, t)
     schema = generate_schema_info(full_g)
-    return full_g, schema
+    version = build_base_visualization(full_g)
+    return full_g, query_g, schema, version
 
 try:
-    full_graph, schema_info = get_graph_data()
+    full_graph, query_graph, schema_info, graph_version = get_graph_data()
     st.session_state.graph_loaded = True
 except Exception as e:
     st.error(f"Failed to load graph: {e}")
     st.stop()
 
+# Sidebar
+with st.sidebar:
+    st.header("🗺️ Ontology Map")
+    
+    # Simple Reset Button
+    if st.button("Reset View"):
+        st.session_state.highlight_ids = [] # Reset visualization
+        st.session_state.focus_ids = []
+        st.rerun()
+
+    # Focused mode: only the neighborhood of the answer's evidence
+    focus = st.toggle("Focus on answer", value=False)
+
+    # Visualization
+    ontology_map(version=graph_version, highlight_ids=st.session_state.highlight_ids,
+                 focus_ids=st.session_state.focus_ids if focus and st.session_state.focus_ids else None,
+                 height=700, key="ontology_map", default=None)
+
 # Title
 st.title("📐 K-Math Ontology Chatbot")
 
@@ -114,18 +141,31 @@ if prompt := st.chat_input("Ask a math question..."):
     
     # Thinking...
     with st.spinner("Analyzing Ontology..."):
-        # 1. Reasoning
-        sparql_res = generate_sparql(prompt, schema_info)
-        
-        # 2. Execution
-        db_data = []
-        if sparql_res and "query" in sparql_res and sparql_res["query"]:
-             db_data = execute_sparql(sparql_res["query"], full_graph)
+        session_store = get_session_store()
+        history = format_history(session_store.get(st.session_state.session_id))
         
-        # 3. Answer Generation
-        final_res = generate_answer(prompt, db_data, sparql_res.get("explanation", ""))
+        final_res = None
+        if model_available():
+            try:
+                # 1. Reasoning
+                sparql_res = generate_sparql(prompt, schema_info, history)
+                
+                # 2. Execution
+                db_data = []
+                if sparql_res and "query" in sparql_res and sparql_res["query"]:
+                     db_data = execute_sparql(sparql_res["query"], query_graph)
+                
+                # 3. Answer Generation
+                final_res = generate_answer(prompt, db_data, sparql_res.get("explanation", ""), history)
+            except CircuitOpen:
+                pass
+        if final_res is None:
+            # Model circuit open: answer from the graph alone
+            final_res = local_answer(query_graph, get_mention_extractor(full_graph).find(prompt), [])
         
         answer_text = final_res.get("answer", "No answer generated.")
+        session_store.append(st.session_state.session_id, "user", prompt)
+        session_store.append(st.session_state.session_id, "assistant", answer_text)
         evidence_data = final_res.get("evidence", [])
         
         # 4. Update Visualization (Highlighting)
@@ -137,8 +177,8 @@ if prompt := st.chat_input("Ask a math question..."):
                 if item.get("subject"): highlight_nodes.append(item["subject"])
             
             try:
-                new_html = visualize_ontology(graph=full_graph, highlight_labels=highlight_nodes, return_html_str=True)
-                st.session_state.viz_html = new_html
+                st.session_state.highlight_ids = resolve_highlight_ids(full_graph, highlight_nodes)
+                st.session_state.focus_ids = sorted(str(uri) for uri in focus_node_ids(full_graph, highlight_nodes))
             except Exception as e:
                 print(f"Visualization Error: {e}")
 
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Same layout the scripts assume: project root (ETL modules, `app.*`) and
+# app/ (flat server modules) on the path.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "app"))
@@ -0,0 +1,37 @@
+import rdflib
+from rdflib import Literal, Namespace
+
+from app.changeset import append_changeset, changes_path, replay, load_with_changes
+
+NS = Namespace("http://math.bot/ontology/")
+
+
+def _base(tmp_path):
+    path = str(tmp_path / "abox.ttl")
+    g = rdflib.Graph()
+    g.add((NS.Con_a, NS.label, Literal("a")))
+    g.serialize(destination=path, format="turtle")
+    return path
+
+
+def test_multiline_quoted_literal_round_trips(tmp_path):
+    base = _base(tmp_path)
+    comment = Literal('첫 줄\n두 번째 "인용" 줄\t\\ 끝')
+    triple = (NS.Con_a, NS.comment, comment)
+
+    assert append_changeset(base, added=[triple], source="test") == 1
+    with open(changes_path(base), encoding="utf-8") as f:
+        assert '"""' not in f.read()
+
+    g = rdflib.Graph()
+    assert replay(g, base) == 1
+    assert triple in g
+    assert triple in load_with_changes(base)
+
+
+def test_removal_after_addition(tmp_path):
+    base = _base(tmp_path)
+    triple = (NS.Con_a, NS.comment, Literal("x\ny"))
+    append_changeset(base, added=[triple])
+    append_changeset(base, removed=[triple])
+    assert triple not in load_with_changes(base)
@@ -0,0 +1,20 @@
+import rdflib
+from rdflib import Literal, Namespace, RDF, RDFS
+
+from export_ontology_report import export_hierarchy
+
+NS = Namespace("http://math.bot/ontology/")
+
+
+def test_ntriples_export_parses_multiline_labels(tmp_path):
+    g = rdflib.Graph()
+    g.add((NS.Sub_a, RDF.type, NS.Subject))
+    g.add((NS.Sub_a, RDFS.label, Literal("수학")))
+    g.add((NS.Sub_a, NS.hasChapter, NS.Chap_a))
+    g.add((NS.Chap_a, RDF.type, NS.Chapter))
+    g.add((NS.Chap_a, RDFS.label, Literal('함수의 "극한"\n둘째 줄 \\')))
+
+    path = export_hierarchy(g, "nt", path=str(tmp_path / "hierarchy.nt"))
+
+    exported = rdflib.Graph().parse(path, format="nt")
+    assert set(exported) == set(g)
@@ -0,0 +1,50 @@
+import rdflib
+from rdflib import Literal, Namespace, RDF, RDFS
+
+from app.changeset import load_with_changes
+from ontology_store import OntologyStore
+
+NS = Namespace("http://math.bot/ontology/")
+
+
+def _store(tmp_path):
+    path = str(tmp_path / "abox.ttl")
+    g = rdflib.Graph()
+    for uri, label in ((NS.Sec_a, "지수"), (NS.Sec_b, "로그")):
+        g.add((uri, RDF.type, NS.Section))
+        g.add((uri, RDFS.label, Literal(label)))
+    g.serialize(destination=path, format="turtle")
+    return OntologyStore(path, on_duplicate="skip")
+
+
+def test_add_then_remove_is_not_saved(tmp_path):
+    store = _store(tmp_path)
+    triple = (NS.Sec_a, NS.prerequisiteOf, NS.Sec_b)
+    assert store.link("지수", "로그", NS.prerequisiteOf, NS.Section)
+    assert store.remove(*triple)
+    assert store.added == [] and store.removed == []
+
+    store.save()
+    assert triple not in load_with_changes(store.path)
+
+
+def test_remove_then_add_keeps_triple(tmp_path):
+    store = _store(tmp_path)
+    triple = (NS.Sec_a, RDFS.label, Literal("지수"))
+    assert store.remove(*triple)
+    assert store.add(*triple)
+    assert store.added == [] and store.removed == []
+
+    store.save()
+    assert triple in load_with_changes(store.path)
+
+
+def test_pending_edits_round_trip(tmp_path):
+    store = _store(tmp_path)
+    store.link("지수", "로그", NS.prerequisiteOf, NS.Section)
+    store.remove(NS.Sec_b, RDFS.label, Literal("로그"))
+    store.save()
+
+    g = load_with_changes(store.path)
+    assert (NS.Sec_a, NS.prerequisiteOf, NS.Sec_b) in g
+    assert (NS.Sec_b, RDFS.label, Literal("로그")) not in g
@@ -0,0 +1,24 @@
+import os
+
+from session_store import DiskSessionStore
+
+
+def test_disk_ids_do_not_collide(tmp_path):
+    store = DiskSessionStore(directory=str(tmp_path / "sessions"))
+    store.append("a/b", "user", "first")
+    store.append("a_b", "user", "second")
+    assert [t["content"] for t in store.get("a/b").turns] == ["first"]
+    assert [t["content"] for t in store.get("a_b").turns] == ["second"]
+
+
+def test_eviction_skips_files_removed_concurrently(tmp_path, monkeypatch):
+    store = DiskSessionStore(directory=str(tmp_path / "sessions"), evict_interval=0, max_sessions=1)
+    store.append("one", "user", "hi")
+
+    real_getmtime = os.path.getmtime
+    def racing_getmtime(path):
+        os.remove(path)  # another worker evicted it first
+        return real_getmtime(path)
+    monkeypatch.setattr(os.path, "getmtime", racing_getmtime)
+
+    store.append("two", "user", "hi")  # must not raise FileNotFoundError
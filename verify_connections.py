@@ -1,8 +1,8 @@
-import rdflib
-from rdflib import Namespace, RDFS, RDF
+from rdflib import Namespace, RDF
+from ontology_store import OntologyStore
 
-g = rdflib.Graph()
-g.parse("data/knowledge_graph/math_abox.ttl", format="turtle")
+store = OntologyStore("data/knowledge_graph/math_abox.ttl")
+g = store.graph
 NS = Namespace("http://math.bot/ontology/")
 
 targets = ["공간좌표", "확률분포", "조건부확률"]
@@ -10,12 +10,7 @@ targets = ["공간좌표", "확률분포", "조건부확률"]
 for target in targets:
     print(f"\nTarget Label: {target}")
     # Find all URIs with this label
-    nodes = []
-    for s, p, o in g.triples((None, RDFS.label, None)):
-        if str(o) == target:
-            # Get Type
-            node_type = g.value(s, RDF.type)
-            nodes.append((s, node_type))
+    nodes = [(s, g.value(s, RDF.type)) for s in store.find_all(target)]
     
     if not nodes:
         print(f"  [Error] No URI found for label '{target}'")
@@ -30,7 +25,7 @@ for target in targets:
         has_incoming = False
         for s, p, o in g.triples((None, NS.prerequisiteOf, uri)):
             has_incoming = True
-            label = g.value(s, RDFS.label)
+            label = store.label(s)
             conn_type = g.value(s, RDF.type)
             conn_type_str = str(conn_type).split('/')[-1] if conn_type else "?"
             print(f"    <- Prereq: {label} ({conn_type_str})")
@@ -40,7 +35,7 @@ for target in targets:
         has_outgoing = False
         for s, p, o in g.triples((uri, NS.prerequisiteOf, None)):
             has_outgoing = True
-            label = g.value(o, RDFS.label)
+            label = store.label(o)
             conn_type = g.value(o, RDF.type)
             conn_type_str = str(conn_type).split('/')[-1] if conn_type else "?"
             print(f"    -> Next:   {label} ({conn_type_str})")
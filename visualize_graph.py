@@ -1,186 +1,319 @@
 import rdflib
-from pyvis.network import Network
 import os
+import json
+import shutil
+import hashlib
+import weakref
 import webbrowser
+from collections import OrderedDict
+from graph_layout import load_or_compute_layout, apply_layout
+from app.changeset import load_with_changes
 
-def visualize_ontology(graph=None, highlight_labels=None, output_file="math_graph.html", return_html_str=False):
-    # 1. Load the Graph
-    if graph:
-        g = graph
-        # print("[INFO] Using provided in-memory graph.")
-    else:
-        g = rdflib.Graph()
-        try:
-            g.parse("data/ontology/math_tbox.ttl", format="turtle")
-            g.parse("data/knowledge_graph/math_abox.ttl", format="turtle")
-            print("[INFO] Graph loaded successfully.")
-        except Exception as e:
-            print(f"[ERROR] Failed to load graph: {e}")
-            return
+# Namespaces
+NS = rdflib.Namespace("http://math.bot/ontology/")
+RDFS = rdflib.Namespace("http://www.w3.org/2000/01/rdf-schema#")
+RDF = rdflib.Namespace("http://www.w3.org/1999/02/22-rdf-syntax-ns#")
 
-    # Normalize highlight_labels for easier matching
-    if highlight_labels:
-        highlight_labels = set(highlight_labels)
-        
-        # [Visual Fix] Connectivity Enhancement: Infer Parents
-        # If a Concept is highlighted, also highlight its Chapter and Subject to show connection.
-        # We need URI to query parents, so let's build a Label->URI map first.
-        label_to_uri = {}
-        for s, p, o in g.triples((None, rdflib.RDFS.label, None)):
-            label_to_uri[str(o)] = s
-            
-        # Optimization: Expand highlight_labels to include parents
-        expanded_labels = set(highlight_labels)
-        queue = list(highlight_labels)
-        
-        while queue:
-            current_lbl = queue.pop(0)
-            if current_lbl not in label_to_uri: continue
-            
-            curr_uri = label_to_uri[current_lbl]
-            
-            # Find parents: ?parent ?p ?curr_uri
-            # We are looking for structural parents (hasSection, hasChapter, hasConcept)
-            for parent in g.subjects(None, curr_uri):
-                # Check if predicate is relevant (optional, but safe to just proceed)
-                parent_lbl = g.value(parent, rdflib.RDFS.label)
-                if parent_lbl:
-                    str_parent_lbl = str(parent_lbl)
-                    if str_parent_lbl not in expanded_labels:
-                        expanded_labels.add(str_parent_lbl)
-                        queue.append(str_parent_lbl)
-        
-        highlight_labels = expanded_labels
+# Static Streamlit component (index.html + vis.js) and per-version graph data.
+# The base graph is written once per ontology version; each chat turn only
+# sends the highlighted node IDs to the component.
+COMPONENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "ontology_map")
+VIS_LIB = "vis-9.1.2"
 
-    else:
-        highlight_labels = set()
+# Bump when the base graph payload format changes (stale files are ignored).
+BASE_REVISION = 2
 
-    # 2. Init Pyvis Network (Style: White Background like the Notebook)
-    # cdn_resources='in_line' embeds the scripts into the HTML, making it standalone (fixes CDN/CORS issues)
-    # [Visual Fix] Disable select_menu to remove "Select by ID" dropdown
-    net = Network(height="800px", width="100%", bgcolor="#ffffff", font_color="black", select_menu=False, directed=True, cdn_resources="in_line")
-    
-    # Notebook specific options injection
-    # [Visual Fix] Tweak physics for stability (stop floating)
-    net.set_options("""
-    var options = {
-      "physics": {
-        "enabled": true,
+# Define Styles (Shapes mimic the 'Mode' from the notebook)
+NODE_STYLES = {
+    "Subject": {"color": "#FF6B6B", "shape": "database", "size": 30},   # Database shape for Subject
+    "Chapter": {"color": "#4ECDC4", "shape": "box", "size": 25},        # Box for Chapter
+    "Section": {"color": "#FFE66D", "shape": "ellipse", "size": 20},    # Ellipse for Section
+    "Concept": {"color": "#1A535C", "shape": "dot", "size": 15},        # Dot for Concept
+    "Other":   {"color": "#97C2FC", "shape": "text", "size": 10}
+}
+
+# Highlight Style
+HIGHLIGHT_STYLE = {"color": "#FF0000", "shape": "star", "size": 35, "borderWidth": 3, "borderColor": "#000000"}
+
+# Notebook specific options injection
+# [Visual Fix] Tweak physics for stability (stop floating)
+NETWORK_OPTIONS = {
+    "physics": {
+        "enabled": True,
         "solver": "forceAtlas2Based",
         "forceAtlas2Based": {
-          "gravitationalConstant": -50,
-          "centralGravity": 0.01,
-          "springLength": 100,
-          "springConstant": 0.08,
-          "damping": 0.9,
-          "avoidOverlap": 0
+            "gravitationalConstant": -50,
+            "centralGravity": 0.01,
+            "springLength": 100,
+            "springConstant": 0.08,
+            "damping": 0.9,
+            "avoidOverlap": 0
         },
         "stabilization": {
-            "enabled": true,
+            "enabled": True,
             "iterations": 1000,
             "updateInterval": 25,
-            "onlyDynamicEdges": false,
-            "fit": true
+            "onlyDynamicEdges": False,
+            "fit": True
         },
         "minVelocity": 0.75,
         "maxVelocity": 30
-      },
-      "nodes": {
+    },
+    "nodes": {
         "shadow": {
-            "enabled": true,
+            "enabled": True,
             "color": "rgba(0,0,0,0.1)",
             "size": 10,
             "x": 5,
             "y": 5
         }
-      }
-    }
-    """)
-
-    # 3. Define Namespaces
-    NS = rdflib.Namespace("http://math.bot/ontology/")
-    RDFS = rdflib.Namespace("http://www.w3.org/2000/01/rdf-schema#")
-    RDF = rdflib.Namespace("http://www.w3.org/1999/02/22-rdf-syntax-ns#")
-
-    # 4. Extract Nodes & Edges
-    def get_label(uri):
-        label = g.value(uri, RDFS.label)
-        if label:
-            return str(label)
-        return str(uri).split("/")[-1]
-
-    def get_group(uri):
-        types = list(g.objects(uri, RDF.type))
-        if NS.Subject in types: return "Subject"
-        if NS.Chapter in types: return "Chapter"
-        if NS.Section in types: return "Section"
-        if NS.Concept in types: return "Concept"
-        return "Other"
-
-    # Define Styles (Shapes mimic the 'Mode' from the notebook)
-    styles = {
-        "Subject": {"color": "#FF6B6B", "shape": "database", "size": 30},   # Database shape for Subject
-        "Chapter": {"color": "#4ECDC4", "shape": "box", "size": 25},        # Box for Chapter
-        "Section": {"color": "#FFE66D", "shape": "ellipse", "size": 20},    # Ellipse for Section
-        "Concept": {"color": "#1A535C", "shape": "dot", "size": 15},        # Dot for Concept
-        "Other":   {"color": "#97C2FC", "shape": "text", "size": 10}
     }
+}
+
+# Layout is precomputed offline (graph_layout.py), so the viewer only draws.
+STATIC_NETWORK_OPTIONS = dict(NETWORK_OPTIONS, physics={"enabled": False},
+                              edges={"smooth": {"type": "continuous"}})
+
+def load_default_graph():
+    g = rdflib.Graph()
+    try:
+        g.parse("data/ontology/math_tbox.ttl", format="turtle")
+        g += load_with_changes("data/knowledge_graph/math_abox.ttl")
+        print("[INFO] Graph loaded successfully.")
+    except Exception as e:
+        print(f"[ERROR] Failed to load graph: {e}")
+        return None
+    return g
+
+def graph_version(g):
+    """
+    Order-independent content hash of the graph.
+    Used to key every artifact that is built once per ontology version.
+    """
+    h = hashlib.sha256()
+    for line in sorted(f"{s.n3()} {p.n3()} {o.n3()}" for s, p, o in g):
+        h.update(line.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()[:16]
+
+HIERARCHY_PROPS = (NS.hasChapter, NS.hasSection, NS.hasConcept)
+
+class NodeTable:
+    """
+    Lookup tables for visualization, built in one pass per graph object
+    (see get_node_table). Replaces per-node g.value / g.objects calls.
+    """
+
+    def __init__(self, g):
+        self.graph = g
+        self.version = graph_version(g)
+        self.label = {}
+        self.comment = {}
+        self.group = {}
+        self.label_to_ids = {}
+        self.edges = []            # (s, prop_name, o), rdf:type excluded
+        self.incoming = {}         # o -> {s} over every predicate
+        self.neighbors = {}        # undirected adjacency of drawn edges
+        self.hierarchy_parents = {}
+
+        types = {}
+        for s, p, o in g:
+            if p == RDFS.label:
+                self.label.setdefault(s, str(o))
+            elif p == RDFS.comment:
+                self.comment.setdefault(s, str(o))
+            elif p == RDF.type:
+                types.setdefault(s, set()).add(o)
+            if isinstance(o, rdflib.URIRef):
+                self.incoming.setdefault(o, set()).add(s)
+            if p in HIERARCHY_PROPS:
+                self.hierarchy_parents.setdefault(o, set()).add(s)
+
+        # Node set: every URI subject (same as iterating g.subjects())
+        self.nodes = []
+        for s in g.subjects(unique=True):
+            if not isinstance(s, rdflib.URIRef): continue
+            self.nodes.append(s)
+            node_types = types.get(s, ())
+            if NS.Subject in node_types: group = "Subject"
+            elif NS.Chapter in node_types: group = "Chapter"
+            elif NS.Section in node_types: group = "Section"
+            elif NS.Concept in node_types: group = "Concept"
+            else: group = "Other"
+            self.group[s] = group
+        for s, lbl in self.label.items():
+            self.label_to_ids.setdefault(lbl, []).append(s)
+
+        node_set = set(self.nodes)
+        for s, p, o in g:
+            if s not in node_set or o not in node_set: continue
+            prop_name = str(p).split("/")[-1].split("#")[-1]
+            if prop_name == "type": continue
+            self.edges.append((s, prop_name, o))
+            self.neighbors.setdefault(s, set()).add(o)
+            self.neighbors.setdefault(o, set()).add(s)
+
+    def get_label(self, uri):
+        return self.label.get(uri) or str(uri).split("/")[-1]
+
+    def ids_for_labels(self, labels):
+        return {uri for lbl in labels for uri in self.label_to_ids.get(lbl, ())}
+
+# Tables are found by graph identity. A table owned by a longer-lived object
+# (a TenantGraph snapshot keeps the one built by attach_node_table) lives as
+# long as its owner, so any number of tenants stay indexed; tables built for
+# unowned graphs (scripts, Streamlit) are kept in a small LRU.
+_owned_tables = weakref.WeakValueDictionary()  # id(graph) -> NodeTable
+_node_tables = OrderedDict()                    # id(graph) -> NodeTable
+MAX_UNOWNED_TABLES = 8
+
+def attach_node_table(g):
+    """
+    Builds the NodeTable for `g` for an owner to keep (e.g. in the tenant
+    registry's on_load hook). get_node_table(g) returns it while the owner
+    holds it.
+    """
+    table = _owned_tables.get(id(g))
+    if table is None or table.graph is not g:
+        table = NodeTable(g)
+        _owned_tables[id(g)] = table
+    return table
+
+def get_node_table(g):
+    """
+    Returns the NodeTable for `g`, building it on first use.
+    Graphs are treated as immutable once loaded; reloads create new objects.
+    """
+    table = _owned_tables.get(id(g))
+    if table is not None and table.graph is g:
+        return table
+    table = _node_tables.get(id(g))
+    if table is None or table.graph is not g:
+        table = NodeTable(g)
+        _node_tables[id(g)] = table
+        while len(_node_tables) > MAX_UNOWNED_TABLES:
+            _node_tables.popitem(last=False)
+    else:
+        _node_tables.move_to_end(id(g))
+    return table
+
+def forget_node_table(g):
+    """Drops the cached NodeTable (and its reference to `g`), e.g. on eviction."""
+    for tables in (_owned_tables, _node_tables):
+        table = tables.get(id(g))
+        if table is not None and table.graph is g:
+            del tables[id(g)]
+
+def expand_highlight_labels(g, highlight_labels):
+    """
+    Returns the set of labels to highlight, including structural parents.
+    """
+    if not highlight_labels:
+        return set()
+
+    table = get_node_table(g)
+    highlight_labels = set(highlight_labels)
     
-    # Highlight Style
-    highlight_style = {"color": "#FF0000", "shape": "star", "size": 35, "borderWidth": 3, "borderColor": "#000000"}
+    # [Visual Fix] Connectivity Enhancement: Infer Parents
+    # If a Concept is highlighted, also highlight its Chapter and Subject to show connection.
+    expanded_labels = set(highlight_labels)
+    queue = list(highlight_labels)
+    
+    while queue:
+        current_lbl = queue.pop(0)
+        
+        # Find parents: ?parent ?p ?curr_uri
+        for curr_uri in table.label_to_ids.get(current_lbl, ()):
+            for parent in table.incoming.get(curr_uri, ()):
+                parent_lbl = table.label.get(parent)
+                if parent_lbl and parent_lbl not in expanded_labels:
+                    expanded_labels.add(parent_lbl)
+                    queue.append(parent_lbl)
+    
+    return expanded_labels
+
+def focus_node_ids(g, labels, hops=1):
+    """
+    Ego-subgraph for focused rendering: the k-hop neighborhood of the
+    evidence nodes, their hierarchy ancestors and every highlighted node.
+    """
+    table = get_node_table(g)
+    seeds = table.ids_for_labels(labels or ())
+    keep = set(seeds)
+
+    frontier = set(seeds)
+    for _ in range(hops):
+        frontier = {n for f in frontier for n in table.neighbors.get(f, ())} - keep
+        keep |= frontier
+
+    stack = list(seeds)
+    while stack:
+        for parent in table.hierarchy_parents.get(stack.pop(), ()):
+            if parent not in keep:
+                keep.add(parent)
+                stack.append(parent)
+
+    keep |= table.ids_for_labels(expand_highlight_labels(g, labels))
+    return keep
+
+def _style_args(style):
+    # Check if style has custom border logic (highlight)
+    extra_args = {}
+    if "borderWidth" in style:
+        extra_args["borderWidth"] = style["borderWidth"]
+        extra_args["color"] = {"background": style["color"], "border": style.get("borderColor", "black")}
+    else:
+        extra_args["color"] = style["color"]
+    
+    # Font color override (removed grey font logic)
+    if "font" in style:
+        extra_args["font"] = style["font"]
+    return extra_args
+
+def build_graph_elements(g, highlight_labels=None, node_ids=None):
+    """
+    Extracts vis.js node/edge dicts from the graph.
+    With `highlight_labels` the highlight styling is baked in (pyvis path);
+    without it the base (unhighlighted) graph is returned.
+    `node_ids` restricts the output to a subgraph (focused mode).
+    """
+    highlight_labels = highlight_labels or set()
+    table = get_node_table(g)
 
     # print("[INFO] Processing Nodes...")
+    nodes = []
+    edges = []
     existing_nodes = set()
     
-    for s in g.subjects(unique=True):
-        if not isinstance(s, rdflib.URIRef): continue
+    for s in table.nodes:
+        if node_ids is not None and s not in node_ids: continue
         str_s = str(s)
         
-        lbl = get_label(s)
-        group = get_group(s)
+        lbl = table.get_label(s)
+        group = table.group[s]
         
         # Determine Style
         # [Visual Update] Only change highlighted nodes. Others stay ORIGINAL.
         if highlight_labels and lbl in highlight_labels:
-            style = highlight_style
+            style = HIGHLIGHT_STYLE
         else:
-            style = styles.get(group, styles["Other"])
+            style = NODE_STYLES.get(group, NODE_STYLES["Other"])
         
         # Tooltip
         title = f"<b>{lbl}</b><br>Type: {group}<br>URI: {s}"
-        comment = g.value(s, RDFS.comment)
+        comment = table.comment.get(s)
         if comment:
              title += f"<br><i>{comment}</i>"
 
-        # Check if style has custom border logic (highlight)
-        extra_args = {}
-        if "borderWidth" in style:
-            extra_args["borderWidth"] = style["borderWidth"]
-            extra_args["color"] = {"background": style["color"], "border": style.get("borderColor", "black")}
-        else:
-            extra_args["color"] = style["color"]
-        
-        # Font color override (removed grey font logic)
-        if "font" in style:
-            extra_args["font"] = style["font"]
-
-        net.add_node(str_s, label=lbl, title=title, 
-                     shape=style["shape"], size=style["size"], group=group, **extra_args)
-        existing_nodes.add(str_s)
+        nodes.append(dict(id=str_s, label=lbl, title=title,
+                          shape=style["shape"], size=style["size"], group=group, **_style_args(style)))
+        existing_nodes.add(s)
 
     # print("[INFO] Processing Edges...")
-    for s, p, o in g:
-        if not isinstance(s, rdflib.URIRef) or not isinstance(o, rdflib.URIRef): continue
-        str_s = str(s)
-        str_o = str(o)
-        
-        if str_s not in existing_nodes or str_o not in existing_nodes:
+    for s, prop_name, o in table.edges:
+        if s not in existing_nodes or o not in existing_nodes:
             continue
         
-        prop_name = str(p).split("/")[-1].split("#")[-1]
-        
-        if prop_name == "type": continue
-        
         # Default Visual Style for Edges (Original Logic)
         width = 1
         edge_color = "#bdbdbd"
@@ -196,11 +329,8 @@ def visualize_ontology(graph=None, highlight_labels=None, output_file="math_grap
 
         # Highlight Logic: Only emphasize "Strong" connections
         if highlight_labels:
-            s_lbl = get_label(s)
-            o_lbl = get_label(o)
-            
-            s_high = s_lbl in highlight_labels
-            o_high = o_lbl in highlight_labels
+            s_high = table.get_label(s) in highlight_labels
+            o_high = table.get_label(o) in highlight_labels
             
             if s_high and o_high:
                 # [Strong] Connection between two relevant nodes
@@ -215,9 +345,101 @@ def visualize_ontology(graph=None, highlight_labels=None, output_file="math_grap
             
             # [Reverted] No dimming for others. They keep the Base Semantic Coloring defined above.
 
-        net.add_edge(str_s, str_o, title=prop_name, color=edge_color, width=width, dashes=dashes)
+        edges.append({"from": str(s), "to": str(o), "title": prop_name, "color": edge_color, "width": width, "dashes": dashes})
+
+    return nodes, edges
+
+def build_positioned_elements(g, highlight_labels=None, node_ids=None):
+    """
+    Same as build_graph_elements, with nodes pinned to the stored layout
+    for this graph version (computed on first use). Focused subgraphs reuse
+    the full-graph coordinates so nodes keep their place across views.
+    """
+    table = get_node_table(g)
+    positions = load_or_compute_layout(table.version,
+                                       [str(n) for n in table.nodes],
+                                       [(str(s), str(o)) for s, _, o in table.edges])
+    nodes, edges = build_graph_elements(g, highlight_labels, node_ids)
+    apply_layout(nodes, positions)
+    return nodes, edges
+
+def build_base_visualization(g, out_dir=COMPONENT_DIR, version=None):
+    """
+    Writes the unhighlighted, pre-laid-out graph as `graph_<artifact>.json`
+    next to the component's index.html (once per ontology version) and
+    copies vis.js there as a separate static asset. Returns the artifact
+    id the component should load.
+    """
+    version = version or get_node_table(g).version
+    artifact = f"{version}_r{BASE_REVISION}"
+    os.makedirs(out_dir, exist_ok=True)
+
+    import pyvis  # pyvis (networkx, jinja2, IPython) is only needed to render; the API server never does
+    lib_dir = os.path.join(os.path.dirname(pyvis.__file__), "lib", VIS_LIB)
+    for asset in ("vis-network.min.js", "vis-network.css"):
+        dest = os.path.join(out_dir, asset)
+        if not os.path.exists(dest):
+            shutil.copyfile(os.path.join(lib_dir, asset), dest)
+
+    data_path = os.path.join(out_dir, f"graph_{artifact}.json")
+    if not os.path.exists(data_path):
+        nodes, edges = build_positioned_elements(g)
+        payload = {
+            "version": artifact,
+            "nodes": nodes,
+            "edges": edges,
+            "options": STATIC_NETWORK_OPTIONS,
+            "highlight": dict(shape=HIGHLIGHT_STYLE["shape"], size=HIGHLIGHT_STYLE["size"], **_style_args(HIGHLIGHT_STYLE)),
+        }
+        tmp_path = data_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, data_path)
+        print(f"[INFO] Base visualization written: {data_path}")
+    return artifact
+
+def resolve_highlight_ids(g, labels):
+    """
+    Maps evidence labels (plus their structural parents) to node IDs.
+    This is the only per-turn visualization work.
+    """
+    expanded = expand_highlight_labels(g, labels)
+    return sorted(str(uri) for uri in get_node_table(g).ids_for_labels(expanded))
+
+def visualize_ontology(graph=None, highlight_labels=None, output_file="math_graph.html", return_html_str=False,
+                       focus=False, hops=1):
+    """
+    Renders the ontology with pyvis. With `focus=True` and highlight labels,
+    only the ego-subgraph around the evidence is rendered (see focus_node_ids),
+    so render time and HTML size scale with the answer.
+    """
+    # 1. Load the Graph
+    g = graph if graph else load_default_graph()
+    if g is None:
+        return
+
+    node_ids = focus_node_ids(g, highlight_labels, hops) if focus and highlight_labels else None
+
+    # Normalize highlight_labels for easier matching
+    highlight_labels = expand_highlight_labels(g, highlight_labels)
+
+    # 2. Init Pyvis Network (Style: White Background like the Notebook)
+    from pyvis.network import Network
+    # cdn_resources='in_line' embeds the scripts into the HTML, making it standalone (fixes CDN/CORS issues)
+    # [Visual Fix] Disable select_menu to remove "Select by ID" dropdown
+    net = Network(height="800px", width="100%", bgcolor="#ffffff", font_color="black", select_menu=False, directed=True, cdn_resources="in_line")
+    net.set_options("var options = " + json.dumps(STATIC_NETWORK_OPTIONS))
+
+    # 3. Nodes & Edges (fixed positions from the offline layout stage)
+    nodes, edges = build_positioned_elements(g, highlight_labels, node_ids)
+    for node in nodes:
+        node = dict(node)
+        net.add_node(node.pop("id"), **node)
+    for edge in edges:
+        edge = dict(edge)
+        net.add_edge(edge.pop("from"), edge.pop("to"), **edge)
 
-    # 5. Output
+    # 4. Output
     if return_html_str:
         return net.generate_html()
     else: